@@ -0,0 +1 @@
+# Benchmarks and load tests (run manually against a configured environment)
@@ -0,0 +1,76 @@
+"""
+Compare CSV parsing engines on whole-file loads.
+
+Runs on CSV files given on the command line, or on a synthetic dataset when none are given
+(no AWS needed):
+
+    python -m benchmarks.csv_engine_benchmark
+    python -m benchmarks.csv_engine_benchmark path/to/train.csv path/to/other.csv
+"""
+import argparse
+import io
+import time
+
+import pandas as pd
+
+from benchmarks.profiler_benchmark import make_frame
+from services.csv_engine import read_csv_bytes
+
+
+def legacy_parse(data: bytes) -> pd.DataFrame:
+    """How uploads were parsed before the engine abstraction: decode, then the pandas C engine"""
+    return pd.read_csv(io.StringIO(data.decode('utf-8')))
+
+
+ENGINES = {
+    "pandas (decoded string)": legacy_parse,
+    "pandas (raw bytes)": lambda data: read_csv_bytes(data, engine="pandas"),
+    "pyarrow (raw bytes)": lambda data: read_csv_bytes(data, engine="pyarrow"),
+}
+
+
+def _time(fn, data: bytes, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(name: str, data: bytes, repeat: int):
+    baseline = legacy_parse(data)
+    print(f"{name}: {len(data) / (1024 * 1024):.1f}MB, {len(baseline)} rows x {len(baseline.columns)} columns")
+
+    timings = {}
+    for engine, parse in ENGINES.items():
+        df = parse(data)
+        # Every engine must see the same rows, columns and missing values
+        assert df.shape == baseline.shape, (engine, df.shape, baseline.shape)
+        assert df.isna().sum().equals(baseline.isna().sum()), engine
+        timings[engine] = _time(parse, data, repeat)
+
+    legacy_seconds = timings["pandas (decoded string)"]
+    for engine, seconds in timings.items():
+        print(f"  {engine:<26} {seconds:.3f}s  ({legacy_seconds / seconds:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PyArrow vs pandas CSV parsing")
+    parser.add_argument("files", nargs="*", help="CSV files to parse (synthetic data when omitted)")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--columns", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.files:
+        for path in args.files:
+            with open(path, 'rb') as f:
+                run(path, f.read(), args.repeat)
+    else:
+        data = make_frame(args.rows, args.columns).to_csv(index=False).encode('utf-8')
+        run("synthetic", data, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,14 @@ class Settings(BaseSettings):
     aws_secret_access_key: str
     aws_region: str = "us-east-2"
     
+    # AWS client tuning (shared by all boto3 clients)
+    aws_max_pool_connections: int = 50
+    aws_connect_timeout: float = 3.0
+    aws_read_timeout: float = 15.0
+    aws_max_retry_attempts: int = 5
+    aws_retry_mode: str = "adaptive"
+    aws_tcp_keepalive: bool = True
+    
     # AWS Cognito Configuration
     cognito_user_pool_id: str
     cognito_app_client_id: str
@@ -15,6 +23,24 @@ class Settings(BaseSettings):
     
     # S3 Configuration
     s3_bucket_name: str = "tinkerfai-project-files"
+    max_upload_size: int = 500 * 1024 * 1024
+    multipart_part_size: int = 16 * 1024 * 1024
+    # Largest size a .csv.gz/.csv.zst upload may inflate to
+    max_decompressed_size: int = 2 * 1024 * 1024 * 1024
+    
+    # Dataset cache: memory budget for parsed DataFrames kept per process
+    dataset_cache_max_bytes: int = 256 * 1024 * 1024
+    # CSV parser for whole-file loads: "auto" (PyArrow, falling back to pandas), "pyarrow" or "pandas"
+    csv_engine: str = "auto"
+    
+    # Upload pipeline: "local" in-process queue or "sqs" (needs upload_queue_url)
+    upload_queue_backend: str = "local"
+    upload_queue_url: str = ""
+    upload_queue_visibility_timeout: int = 300
+    upload_workers: int = 2
+    
+    # Comma-separated users allowed to read /api/metrics; empty lets any signed-in user
+    metrics_allowed_emails: str = ""
     
     # OpenAI Configuration
     openai_api_key: str
@@ -0,0 +1 @@
+# Jobs package for admin/CLI maintenance tasks
@@ -0,0 +1,197 @@
+"""
+Scheduled S3 sweeper for project uploads.
+
+Every re-upload of a dataset creates a new timestamped key, so older uploads (and the
+Parquet sidecar, profile and status files stored next to them) pile up. This job pages
+through every project prefix and deletes uploads superseded by a newer one for the same
+task/subtask, keeping any upload a saved answer still points at. Optionally it also expires
+unreferenced uploads older than --days-old. Other project files (dataset version history) and
+the content-addressed artifacts under datasets/sha256/, which uploads of different projects
+share, are never swept here. Usage:
+
+    python -m jobs.cleanup_uploads --dry-run
+    python -m jobs.cleanup_uploads --grace-hours 24 --interval 3600
+"""
+import argparse
+import json
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from services.dynamodb import dynamodb_service
+from services.s3 import s3_service
+
+logger = logging.getLogger(__name__)
+
+ROOT_PREFIX = "projects/"
+# projects/{email}/{project_id}/task_{t}_subtask_{s}_{YYYYmmdd_HHMMSS}_{file name}
+UPLOAD_KEY = re.compile(r"^(projects/([^/]+)/([^/]+)/)task_(\d+)_subtask_(\d+)_(\d{8}_\d{6})_(.+)$")
+# Pending deletes are flushed once this many keys are queued, keeping memory flat
+FLUSH_KEYS = 10000
+
+
+class UploadSweeper:
+    """One sweep over the bucket; counters accumulate into a report"""
+
+    def __init__(self, grace: timedelta, max_age: Optional[timedelta] = None,
+                 dry_run: bool = False, max_workers: int = 8):
+        self.grace = grace
+        self.max_age = max_age
+        self.dry_run = dry_run
+        self.max_workers = max_workers
+        self.now = datetime.now(timezone.utc)
+        self._pending: List[str] = []
+        self._pending_bytes: Dict[str, int] = {}
+        self.report: Dict[str, Any] = {
+            "projects": 0,
+            "objectsScanned": 0,
+            "bytesScanned": 0,
+            "supersededUploads": 0,
+            "expiredObjects": 0,
+            "objectsDeleted": 0,
+            "bytesReclaimed": 0,
+            "failed": 0,
+            "skippedProjects": 0,
+        }
+
+    def _projects(self) -> Iterator[List[Dict[str, Any]]]:
+        """Objects grouped by project; listing order is lexicographic so each prefix is contiguous"""
+        current_prefix = None
+        objects: List[Dict[str, Any]] = []
+        for obj in s3_service.iter_objects(ROOT_PREFIX):
+            self.report["objectsScanned"] += 1
+            self.report["bytesScanned"] += obj['Size']
+            prefix = "/".join(obj['Key'].split("/")[:3])
+            if prefix != current_prefix and objects:
+                yield objects
+                objects = []
+            current_prefix = prefix
+            objects.append(obj)
+        if objects:
+            yield objects
+
+    def _referenced_keys(self, user_email: str, project_id: str) -> Optional[Set[str]]:
+        """Upload keys saved in the project's answers; None when they can't be read"""
+        result = dynamodb_service.get_project_answers(user_email, project_id)
+        if not result["success"]:
+            return None
+        return {answer.get("fileUrl") for answer in result["answers"]} - {None, ""}
+
+    def _sweepable(self, objects: List[Dict[str, Any]], expire_before: Optional[datetime]) -> List[Dict[str, Any]]:
+        """
+        Objects of uploads replaced by a newer upload for the same task/subtask, or (with a max age)
+        untouched since expire_before. Uploads a saved answer still points at are always kept, and
+        the whole project is skipped when its answers can't be read.
+        """
+        keys = sorted(obj['Key'] for obj in objects)
+        # An upload's derived files are named {upload key}.{suffix}; sorted order puts them right after it
+        owners: Dict[str, str] = {}
+        uploads: Dict[tuple, List[tuple]] = {}
+        owner = None
+        for key in keys:
+            if owner is not None and key.startswith(owner + "."):
+                owners[key] = owner
+                continue
+            match = UPLOAD_KEY.match(key)
+            if not match:
+                owner = None
+                continue
+            owner = key
+            owners[key] = key
+            uploads.setdefault((match.group(4), match.group(5)), []).append((match.group(6), key))
+
+        newest: Dict[str, datetime] = {}
+        for obj in objects:
+            upload = owners.get(obj['Key'])
+            if upload is not None:
+                newest[upload] = max(newest.get(upload, obj['LastModified']), obj['LastModified'])
+
+        replaced = set()
+        for versions in uploads.values():
+            versions.sort()
+            replaced.update(key for _, key in versions[:-1])
+        expired = {upload for upload, modified in newest.items() if expire_before and modified < expire_before}
+        if not replaced and not expired:
+            return []
+
+        match = UPLOAD_KEY.match(next(iter(replaced | expired)))
+        referenced = self._referenced_keys(match.group(2), match.group(3))
+        if referenced is None:
+            self.report["skippedProjects"] += 1
+            return []
+
+        cutoff = self.now - self.grace
+        # Leave uploads alone while any of their files is still being written
+        replaced = {upload for upload in replaced - referenced if newest[upload] < cutoff}
+        expired = expired - referenced - replaced
+        self.report["supersededUploads"] += len(replaced)
+        swept = [obj for obj in objects if owners.get(obj['Key']) in replaced | expired]
+        self.report["expiredObjects"] += sum(1 for obj in swept if owners[obj['Key']] in expired)
+        return swept
+
+    def _queue(self, objects: List[Dict[str, Any]]):
+        for obj in objects:
+            if obj['Key'] not in self._pending_bytes:
+                self._pending.append(obj['Key'])
+                self._pending_bytes[obj['Key']] = obj['Size']
+        if len(self._pending) >= FLUSH_KEYS:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        if self.dry_run:
+            deleted, failed = len(self._pending), set()
+        else:
+            result = s3_service.delete_objects(self._pending, max_workers=self.max_workers)
+            deleted, failed = result["deleted"], set(result["failed"])
+        self.report["objectsDeleted"] += deleted
+        self.report["failed"] += len(failed)
+        self.report["bytesReclaimed"] += sum(size for key, size in self._pending_bytes.items() if key not in failed)
+        self._pending = []
+        self._pending_bytes = {}
+
+    def run(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        expire_before = self.now - self.max_age if self.max_age else None
+        for objects in self._projects():
+            self.report["projects"] += 1
+            self._queue(self._sweepable(objects, expire_before))
+        self._flush()
+        self.report["dryRun"] = self.dry_run
+        self.report["seconds"] = round(time.monotonic() - started, 2)
+        return self.report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete superseded and expired project uploads from S3")
+    parser.add_argument("--grace-hours", type=float, default=24.0,
+                        help="Only delete superseded uploads untouched for this long")
+    parser.add_argument("--days-old", type=int, default=None,
+                        help="Also delete unreferenced uploads older than this many days")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent delete batches")
+    parser.add_argument("--interval", type=int, default=None,
+                        help="Repeat the sweep every N seconds instead of running once")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    while True:
+        sweeper = UploadSweeper(
+            grace=timedelta(hours=args.grace_hours),
+            max_age=timedelta(days=args.days_old) if args.days_old else None,
+            dry_run=args.dry_run,
+            max_workers=args.workers
+        )
+        report = sweeper.run()
+        logger.info(f"Sweep finished: {report['objectsDeleted']} objects, {report['bytesReclaimed']} bytes reclaimed")
+        print(json.dumps(report))
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Platform-wide DynamoDB export job.
+
+Runs a parallel segmented scan over the projects table and streams every item
+as NDJSON or Parquet to local disk or S3. Usage:
+
+    python -m jobs.export_table --segments 8 --format parquet \
+        --output s3://my-bucket/exports/projects.parquet --capacity-fraction 0.25
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from boto3.dynamodb.conditions import Attr
+from botocore.config import Config
+
+from config import settings
+from services.aws import aws_client_factory
+
+logger = logging.getLogger(__name__)
+
+# Sentinel pushed onto the item queue when a segment finishes
+_SEGMENT_DONE = object()
+# Scanners blocked on a full queue wake up this often to check whether the export was stopped
+PUT_TIMEOUT_SECONDS = 1.0
+# On-demand tables report no provisioned capacity; budget against this many RCU/s unless the
+# table has a maximum read throughput or --read-capacity says otherwise
+ON_DEMAND_READ_CAPACITY = 400.0
+
+# Columns promoted to top-level Parquet fields; everything else goes into `attributes`
+PARQUET_SCHEMA = pa.schema([
+    ("PK", pa.string()),
+    ("SK", pa.string()),
+    ("itemType", pa.string()),
+    ("userEmail", pa.string()),
+    ("projectId", pa.string()),
+    ("taskIndex", pa.int32()),
+    ("subtaskIndex", pa.int32()),
+    ("attributes", pa.string()),
+])
+
+
+def _to_plain(value: Any) -> Any:
+    """Convert DynamoDB Decimals/sets into JSON-serializable values"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {k: _to_plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_to_plain(v) for v in value]
+    return value
+
+
+class CapacityThrottle:
+    """Thread-safe limiter keeping consumed read units under a target rate"""
+
+    def __init__(self, units_per_second: float):
+        self.units_per_second = units_per_second
+        self._lock = threading.Lock()
+        self._next_free = time.monotonic()
+
+    def consume(self, units: float):
+        """Account for consumed units and sleep until the budget allows more reads"""
+        if self.units_per_second <= 0 or units <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_free)
+            self._next_free = start + units / self.units_per_second
+            wait = start - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+class TableExporter:
+    def __init__(self, table_name: str, segments: int, capacity_fraction: float,
+                 read_capacity: Optional[float] = None, item_type: Optional[str] = None,
+                 page_size: int = 500, queue_size: int = 5000):
+        # One pooled connection per segment plus headroom for the writer's upload
+        self.dynamodb = aws_client_factory.resource(
+            'dynamodb', config=Config(max_pool_connections=max(segments + 2, 10))
+        )
+        self.table = self.dynamodb.Table(table_name)
+        self.segments = segments
+        self.item_type = item_type
+        self.page_size = page_size
+        # Bounded queue keeps memory flat when the writer is slower than the scanners
+        self.items: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        # Set when the consumer stops early (writer error, closed generator, failed segment)
+        self._stop = threading.Event()
+        self.throttle = CapacityThrottle(self._target_read_rate(capacity_fraction, read_capacity))
+        self.consumed_units = 0.0
+        self._consumed_lock = threading.Lock()
+
+    def _target_read_rate(self, capacity_fraction: float, read_capacity: Optional[float]) -> float:
+        """Work out the RCU/s budget from provisioned capacity or an explicit override"""
+        if read_capacity is None:
+            table = self.table.meta.client.describe_table(TableName=self.table.name)['Table']
+            read_capacity = float(table.get('ProvisionedThroughput', {}).get('ReadCapacityUnits', 0))
+            if not read_capacity:
+                # On-demand tables report 0 provisioned units; -1 means no maximum is set
+                maximum = float(table.get('OnDemandThroughput', {}).get('MaxReadRequestUnits', -1))
+                read_capacity = maximum if maximum > 0 else ON_DEMAND_READ_CAPACITY
+                logger.info(f"Table is on-demand; budgeting against {read_capacity:.0f} RCU/s "
+                            f"(pass --read-capacity to change)")
+        rate = read_capacity * capacity_fraction
+        logger.info(f"Throttling export to {rate:.1f} RCU/s")
+        return rate
+
+    def _scan_segment(self, segment: int):
+        """Scan a single segment, pushing items onto the shared queue"""
+        scan_kwargs: Dict[str, Any] = {
+            'Segment': segment,
+            'TotalSegments': self.segments,
+            'Limit': self.page_size,
+            'ReturnConsumedCapacity': 'TOTAL'
+        }
+        if self.item_type:
+            scan_kwargs['FilterExpression'] = Attr('itemType').eq(self.item_type)
+
+        try:
+            while not self._stop.is_set():
+                response = self.table.scan(**scan_kwargs)
+                units = response.get('ConsumedCapacity', {}).get('CapacityUnits', 0.0)
+                with self._consumed_lock:
+                    self.consumed_units += units
+                for item in response.get('Items', []):
+                    if not self._put(item):
+                        return
+                self.throttle.consume(units)
+
+                last_key = response.get('LastEvaluatedKey')
+                if not last_key:
+                    break
+                scan_kwargs['ExclusiveStartKey'] = last_key
+            self._put((_SEGMENT_DONE, None))
+        except Exception as e:
+            logger.error(f"Segment {segment} failed: {e}")
+            self._put((_SEGMENT_DONE, e))
+
+    def _put(self, item: Any) -> bool:
+        """Queue an item, giving up (False) once the export is stopped"""
+        while not self._stop.is_set():
+            try:
+                self.items.put(item, timeout=PUT_TIMEOUT_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _drain(self):
+        while True:
+            try:
+                self.items.get_nowait()
+            except queue.Empty:
+                return
+
+    def iter_items(self) -> Iterator[Dict[str, Any]]:
+        """
+        Yield items from all segments as they arrive. The first failed segment fails the export;
+        when it fails or the caller stops iterating, the remaining scanners are stopped.
+        """
+        self._stop.clear()
+        executor = ThreadPoolExecutor(max_workers=self.segments)
+        try:
+            for segment in range(self.segments):
+                executor.submit(self._scan_segment, segment)
+
+            remaining = self.segments
+            while remaining:
+                item = self.items.get()
+                if isinstance(item, tuple) and item and item[0] is _SEGMENT_DONE:
+                    if item[1] is not None:
+                        raise item[1]
+                    remaining -= 1
+                    continue
+                yield _to_plain(item)
+        finally:
+            self._stop.set()
+            # Unblock scanners waiting on a full queue, then wait for them to exit
+            self._drain()
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._drain()
+
+
+def _write_ndjson(items: Iterator[Dict[str, Any]], path: str) -> int:
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for item in items:
+            f.write(json.dumps(item, separators=(',', ':'), default=str))
+            f.write('\n')
+            count += 1
+    return count
+
+
+def _to_parquet_row(item: Dict[str, Any]) -> Dict[str, Any]:
+    promoted = {name: item.get(name) for name in PARQUET_SCHEMA.names if name != "attributes"}
+    rest = {k: v for k, v in item.items() if k not in promoted}
+    promoted["attributes"] = json.dumps(rest, separators=(',', ':'), default=str)
+    return promoted
+
+
+def _write_parquet(items: Iterator[Dict[str, Any]], path: str, batch_rows: int = 10000) -> int:
+    count = 0
+    batch: List[Dict[str, Any]] = []
+    with pq.ParquetWriter(path, PARQUET_SCHEMA, compression='zstd') as writer:
+        for item in items:
+            batch.append(_to_parquet_row(item))
+            if len(batch) >= batch_rows:
+                writer.write_table(pa.Table.from_pylist(batch, schema=PARQUET_SCHEMA))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=PARQUET_SCHEMA))
+            count += len(batch)
+    return count
+
+
+def _split_s3_url(url: str) -> Tuple[str, str]:
+    bucket, _, key = url[len("s3://"):].partition("/")
+    return bucket, key
+
+
+def run_export(output: str, fmt: str, segments: int, capacity_fraction: float,
+               read_capacity: Optional[float] = None, item_type: Optional[str] = None) -> Dict[str, Any]:
+    """Export the table to a local path or s3:// URL"""
+    exporter = TableExporter(
+        settings.dynamodb_table_name, segments, capacity_fraction,
+        read_capacity=read_capacity, item_type=item_type
+    )
+    writer = _write_parquet if fmt == "parquet" else _write_ndjson
+    started = time.monotonic()
+
+    if output.startswith("s3://"):
+        # Spool to disk, then let s3transfer do a multipart upload with bounded memory
+        bucket, key = _split_s3_url(output)
+        fd, local_path = tempfile.mkstemp(suffix=f".{fmt}")
+        os.close(fd)
+        try:
+            count = writer(exporter.iter_items(), local_path)
+            s3_client = aws_client_factory.client('s3')
+            s3_client.upload_file(local_path, bucket, key)
+        finally:
+            os.remove(local_path)
+    else:
+        count = writer(exporter.iter_items(), output)
+
+    result = {
+        "items": count,
+        "consumedReadUnits": exporter.consumed_units,
+        "seconds": round(time.monotonic() - started, 2),
+        "output": output
+    }
+    logger.info(f"Export finished: {result}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel scan export of the projects table")
+    parser.add_argument("--output", required=True, help="Local file path or s3://bucket/key")
+    parser.add_argument("--format", choices=["ndjson", "parquet"], default="ndjson")
+    parser.add_argument("--segments", type=int, default=4, help="Number of parallel scan segments")
+    parser.add_argument("--capacity-fraction", type=float, default=0.25,
+                        help="Fraction of table read capacity the export may consume")
+    parser.add_argument("--read-capacity", type=float, default=None,
+                        help="Read capacity (RCU/s) to budget against; defaults to the provisioned capacity, "
+                             f"or {ON_DEMAND_READ_CAPACITY:.0f} for on-demand tables")
+    parser.add_argument("--item-type", choices=["PROJECT", "QUESTION_ANSWER"], default=None,
+                        help="Only export items of this type")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    run_export(
+        args.output, args.format, args.segments, args.capacity_fraction,
+        read_capacity=args.read_capacity, item_type=args.item_type
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,28 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Request
+from starlette.routing import Match
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from models import (
     SignupRequest, SigninRequest, TokenValidateRequest,
     ForgotPasswordRequest, ResetPasswordRequest,
     ConfirmSignupRequest, ResendConfirmationRequest,
     CreateProjectRequest, CreateProjectResponse, GetProjectsResponse,
     SuccessResponse, ErrorResponse, QuestionRequest, AnswerSubmissionRequest,
-    FileUploadRequest, FileUploadResponse, FileValidationResponse
+    FileUploadRequest, FileUploadResponse, FileValidationResponse,
+    MultipartUploadResponse, UploadStatusResponse, DatasetRowsResponse, PreprocessedDatasetResponse
 )
 from services.cognito import cognito_service
 from services.project import project_service
 from services.question import question_service
 from services.s3 import s3_service
+from services.dataset import dataset_service
+from services.formats import is_dataset_upload, content_type_for
+from services.metrics import metrics_service, current_endpoint
+from services.upload_pipeline import upload_pipeline, validate_upload, READY
+from services.preprocessing import preprocessing_service
 from dependencies import get_current_user_email
+from config import settings
+from typing import Optional
 import logging
 logging.basicConfig(level=logging.INFO)
 
@@ -34,6 +44,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def start_upload_workers():
+    """Start the background workers that validate and profile confirmed uploads"""
+    upload_pipeline.start()
+
+@app.on_event("shutdown")
+async def stop_upload_workers():
+    upload_pipeline.stop()
+
+@app.middleware("http")
+async def track_endpoint(request: Request, call_next):
+    """Tag downstream metrics with the matched route template"""
+    endpoint = f"{request.method} {request.url.path}"
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            endpoint = f"{request.method} {route.path}"
+            break
+    token = current_endpoint.set(endpoint)
+    try:
+        return await call_next(request)
+    finally:
+        current_endpoint.reset(token)
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -478,13 +512,41 @@ async def get_upload_url(
     task_index: int = Form(...),
     subtask_index: int = Form(...),
     file_name: str = Form(...),
+    upload_method: str = Form("put"),
+    content_sha256: Optional[str] = Form(None),
     user_email: str = Depends(get_current_user_email)
 ):
-    """Get presigned URL for file upload"""
+    """
+    Get presigned URL for file upload (upload_method="post" returns a size/type-restricted POST form).
+    When content_sha256 matches one of the caller's own stored datasets, the bytes are copied server-side
+    and nothing needs uploading.
+    """
     try:
-        result = s3_service.generate_presigned_upload_url(
-            user_email, project_id, task_index, subtask_index, file_name
-        )
+        source_key = dataset_service.find_source(user_email, content_sha256) if content_sha256 else None
+        # The copy keeps the source bytes, so its name must imply the same format and compression
+        if source_key and is_dataset_upload(file_name) and content_type_for(file_name) == content_type_for(source_key):
+            result = s3_service.copy_upload(
+                source_key, user_email, project_id, task_index, subtask_index, file_name
+            )
+            if result["success"]:
+                dataset_service.link_content(result["file_key"], content_sha256)
+                return FileUploadResponse(
+                    success=True,
+                    message=result["message"],
+                    uploadRequired=False,
+                    fileKey=result["file_key"]
+                )
+        
+        if upload_method == "post":
+            result = s3_service.generate_presigned_upload_post(
+                user_email, project_id, task_index, subtask_index, file_name
+            )
+        elif upload_method == "put":
+            result = s3_service.generate_presigned_upload_url(
+                user_email, project_id, task_index, subtask_index, file_name, content_sha256
+            )
+        else:
+            raise HTTPException(status_code=400, detail="upload_method must be 'put' or 'post'")
         
         if not result["success"]:
             raise HTTPException(status_code=400, detail=result["message"])
@@ -493,6 +555,8 @@ async def get_upload_url(
             success=True,
             message=result["message"],
             uploadUrl=result["upload_url"],
+            uploadFields=result.get("upload_fields"),
+            uploadHeaders=result.get("upload_headers"),
             fileKey=result["file_key"]
         )
     
@@ -502,6 +566,152 @@ async def get_upload_url(
         logger.error(f"Get upload URL error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/api/projects/{project_id}/multipart-upload")
+async def start_multipart_upload(
+    project_id: str,
+    task_index: int = Form(...),
+    subtask_index: int = Form(...),
+    file_name: str = Form(...),
+    file_size: int = Form(...),
+    user_email: str = Depends(get_current_user_email)
+):
+    """Start a multipart upload for a large file and get presigned part URLs"""
+    try:
+        result = s3_service.create_multipart_upload(
+            user_email, project_id, task_index, subtask_index, file_name, file_size
+        )
+        
+        if not result["success"]:
+            raise HTTPException(status_code=400, detail=result["message"])
+        
+        return MultipartUploadResponse(
+            success=True,
+            message=result["message"],
+            uploadId=result["upload_id"],
+            fileKey=result["file_key"],
+            partSize=result["part_size"],
+            parts=result["parts"]
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Start multipart upload error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.post("/api/projects/{project_id}/multipart-upload/complete")
+async def complete_multipart_upload(
+    project_id: str,
+    file_key: str = Form(...),
+    upload_id: str = Form(...),
+    part_count: int = Form(...),
+    file_size: int = Form(...),
+    user_email: str = Depends(get_current_user_email)
+):
+    """Complete a multipart upload once all parts have been PUT; part_count and file_size are checked against S3"""
+    try:
+        if not s3_service.owns_file_key(user_email, project_id, file_key):
+            raise HTTPException(status_code=403, detail="Invalid project access")
+        
+        result = s3_service.complete_multipart_upload(file_key, upload_id, part_count, file_size)
+        
+        if not result["success"]:
+            raise HTTPException(status_code=400, detail=result["message"])
+        
+        return FileUploadResponse(
+            success=True,
+            message=result["message"],
+            fileKey=result["file_key"]
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Complete multipart upload error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.post("/api/projects/{project_id}/multipart-upload/abort")
+async def abort_multipart_upload(
+    project_id: str,
+    file_key: str = Form(...),
+    upload_id: str = Form(...),
+    user_email: str = Depends(get_current_user_email)
+):
+    """Abort a multipart upload"""
+    try:
+        if not s3_service.owns_file_key(user_email, project_id, file_key):
+            raise HTTPException(status_code=403, detail="Invalid project access")
+        
+        if not s3_service.abort_multipart_upload(file_key, upload_id):
+            raise HTTPException(status_code=400, detail="Failed to abort upload")
+        
+        return SuccessResponse(
+            success=True,
+            message="Upload aborted"
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Abort multipart upload error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.post("/api/projects/{project_id}/upload-complete", response_model=UploadStatusResponse)
+async def upload_complete(
+    project_id: str,
+    file_key: str = Form(...),
+    user_email: str = Depends(get_current_user_email)
+):
+    """Confirm an upload so it is validated and profiled in the background"""
+    try:
+        if not s3_service.owns_file_key(user_email, project_id, file_key):
+            raise HTTPException(status_code=403, detail="Invalid project access")
+        
+        status = upload_pipeline.enqueue(file_key, user_email, project_id)
+        
+        return UploadStatusResponse(
+            success=True,
+            fileKey=file_key,
+            status=status["status"],
+            message=status["message"]
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Upload complete error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/api/projects/{project_id}/upload-status", response_model=UploadStatusResponse)
+async def get_upload_status(
+    project_id: str,
+    file_key: str,
+    user_email: str = Depends(get_current_user_email)
+):
+    """Poll the background processing status of a confirmed upload"""
+    try:
+        if not s3_service.owns_file_key(user_email, project_id, file_key):
+            raise HTTPException(status_code=403, detail="Invalid project access")
+        
+        status = upload_pipeline.get_status(file_key)
+        if status is None:
+            raise HTTPException(status_code=404, detail="Upload has not been confirmed")
+        
+        return UploadStatusResponse(
+            success=True,
+            fileKey=file_key,
+            status=status["status"],
+            message=status["message"],
+            validationDetails=status.get("validationDetails"),
+            updatedAt=status.get("updatedAt")
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Get upload status error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @app.post("/api/projects/{project_id}/validate-file")
 async def validate_file(
     project_id: str,
@@ -510,43 +720,29 @@ async def validate_file(
 ):
     """Validate uploaded CSV file"""
     try:
-        # Validate and process CSV
-        is_valid, message, csv_data = s3_service.validate_and_process_csv(file_key)
+        if not s3_service.owns_file_key(user_email, project_id, file_key):
+            raise HTTPException(status_code=403, detail="Invalid project access")
         
-        if not is_valid:
+        # Uploads confirmed through upload-complete are processed by the workers; only uploads
+        # that were never enqueued are validated in the request, off the event loop
+        result = upload_pipeline.get_status(file_key)
+        if result is None:
+            result = await run_in_threadpool(validate_upload, file_key, user_email, project_id)
+        
+        if result["status"] != READY:
             return FileValidationResponse(
                 success=False,
-                message=message,
-                isValid=False
+                message=result["message"],
+                isValid=False,
+                status=result["status"]
             )
         
-        # Get project context for AI validation
-        from services.dynamodb import dynamodb_service
-        project_result = dynamodb_service.get_project(user_email, project_id)
-        
-        if project_result["success"]:
-            context = project_result["project"].get("context_for_LLM", "")
-            
-            # AI validation
-            from services.openai import openai_service
-            ai_is_valid, ai_message = openai_service.validate_csv_content(csv_data, context)
-            
-            if not ai_is_valid:
-                return FileValidationResponse(
-                    success=False,
-                    message=ai_message,
-                    isValid=False
-                )
-        
         return FileValidationResponse(
             success=True,
-            message="File validation successful",
+            message=result["message"],
             isValid=True,
-            validationDetails={
-                "rowCount": len(csv_data),
-                "columnCount": len(csv_data[0].keys()) if csv_data else 0,
-                "columns": list(csv_data[0].keys()) if csv_data else []
-            }
+            validationDetails=result["validationDetails"],
+            status=result["status"]
         )
     
     except HTTPException:
@@ -555,6 +751,85 @@ async def validate_file(
         logger.error(f"Validate file error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/api/projects/{project_id}/dataset/rows", response_model=DatasetRowsResponse)
+async def get_dataset_rows(
+    project_id: str,
+    offset: int = 0,
+    limit: int = 100,
+    columns: Optional[str] = None,
+    user_email: str = Depends(get_current_user_email)
+):
+    """Page through the project's dataset; columns is a comma-separated list (all when omitted)"""
+    try:
+        from services.dynamodb import dynamodb_service
+        csv_answer = dynamodb_service.get_specific_answer(user_email, project_id, 2, 0)
+        file_key = csv_answer["answer"].get("fileUrl") if csv_answer["success"] else None
+        if not file_key:
+            raise HTTPException(status_code=404, detail="No dataset uploaded for this project")
+        
+        selected = [col.strip() for col in columns.split(",") if col.strip()] if columns else None
+        try:
+            page = dataset_service.read_rows(file_key, offset, limit, selected)
+        except KeyError as e:
+            raise HTTPException(status_code=400, detail=f"Unknown columns: {e.args[0]}")
+        
+        return DatasetRowsResponse(success=True, **page)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Get dataset rows error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+@app.get("/api/projects/{project_id}/preprocessed", response_model=PreprocessedDatasetResponse)
+async def get_preprocessed_dataset(
+    project_id: str,
+    user_email: str = Depends(get_current_user_email)
+):
+    """
+    Dataset with the project's Task 3 choices applied, built on first request and reused afterwards.
+    Includes the train/test split once the Task 4 slider is answered.
+    """
+    try:
+        from services.dynamodb import dynamodb_service
+        slider_answer = dynamodb_service.get_specific_answer(user_email, project_id, 4, 0)
+        train_percentage = slider_answer["answer"].get("sliderValue") if slider_answer["success"] else None
+        if train_percentage is not None:
+            result = preprocessing_service.prepare_split(user_email, project_id, train_percentage)
+        else:
+            result = preprocessing_service.prepare_project(user_email, project_id)
+        if not result["success"]:
+            raise HTTPException(status_code=400, detail=result["message"])
+        
+        manifest = result["manifest"]
+        return PreprocessedDatasetResponse(
+            success=True,
+            message=result["message"],
+            manifest=manifest,
+            # With a split, download the copy whose parameters were fitted on the training rows
+            downloadUrl=s3_service.get_file_url((result.get("split") or manifest)["dataKey"]),
+            split=result.get("split")
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Get preprocessed dataset error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+# ========== METRICS ENDPOINTS ==========
+
+@app.get("/api/metrics")
+async def get_metrics(user_email: str = Depends(get_current_user_email)):
+    """Per-endpoint DynamoDB latency and consumed capacity since process start"""
+    allowed = {email.strip() for email in settings.metrics_allowed_emails.split(",") if email.strip()}
+    if allowed and user_email not in allowed:
+        raise HTTPException(status_code=403, detail="Not allowed to read metrics")
+    return {
+        "success": True,
+        "dynamodb": metrics_service.dynamodb_summary()
+    }
+
 # ========== TEST ENDPOINTS ==========
 
 @app.get("/api/test-cognito")
@@ -126,13 +126,52 @@ class FileUploadResponse(BaseModel):
     success: bool
     message: str
     uploadUrl: Optional[str] = None  # Pre-signed S3 URL
+    uploadFields: Optional[Dict[str, str]] = None  # Form fields for presigned POST uploads
+    uploadHeaders: Optional[Dict[str, str]] = None  # Headers the presigned PUT must be sent with
+    uploadRequired: bool = True  # False when a known content hash was reused and nothing needs uploading
     fileKey: Optional[str] = None
 
+class MultipartUploadPart(BaseModel):
+    partNumber: int
+    url: str  # Pre-signed S3 URL for this part
+
+class MultipartUploadResponse(BaseModel):
+    success: bool
+    message: str
+    uploadId: Optional[str] = None
+    fileKey: Optional[str] = None
+    partSize: Optional[int] = None  # In bytes; every part except the last must be exactly this size
+    parts: List[MultipartUploadPart] = []
+
 class FileValidationResponse(BaseModel):
     success: bool
     message: str
     isValid: bool
     validationDetails: Optional[Dict[str, Any]] = None
+    status: Optional[str] = None  # queued/processing while a confirmed upload is still being processed
+
+class UploadStatusResponse(BaseModel):
+    success: bool
+    fileKey: str
+    status: str  # queued, processing, ready, invalid or failed
+    message: str
+    validationDetails: Optional[Dict[str, Any]] = None
+    updatedAt: Optional[str] = None
+
+class DatasetRowsResponse(BaseModel):
+    success: bool
+    totalRows: int
+    offset: int
+    limit: int
+    columns: List[str]
+    data: Dict[str, List[Any]]  # Column name -> values for the requested page
+
+class PreprocessedDatasetResponse(BaseModel):
+    success: bool
+    message: str
+    manifest: Optional[Dict[str, Any]] = None  # Choices, fitted parameters, row counts and artifact keys
+    downloadUrl: Optional[str] = None  # Pre-signed URL of the preprocessed Parquet file
+    split: Optional[Dict[str, Any]] = None  # Train/test split summary once the Task 4 slider is answered
 
 # CSV analysis models (unchanged)
 class DatasetSummaryResponse(BaseModel):
@@ -0,0 +1,62 @@
+import boto3
+from botocore.config import Config
+from config import settings
+from typing import Any, Dict, Optional
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class AWSClientFactory:
+    """Builds boto3 clients/resources that share one session and one tuned botocore config"""
+
+    def __init__(self):
+        self.session = boto3.session.Session(
+            aws_access_key_id=settings.aws_access_key_id,
+            aws_secret_access_key=settings.aws_secret_access_key,
+            region_name=settings.aws_region
+        )
+        self.config = self.build_config()
+        self._clients: Dict[str, Any] = {}
+        # Session.client() is not thread-safe, so client creation is serialized
+        self._lock = threading.Lock()
+
+    def build_config(self, **overrides) -> Config:
+        """Botocore config with pooled connections, keep-alive, short timeouts and adaptive retries"""
+        options = {
+            "region_name": settings.aws_region,
+            "max_pool_connections": settings.aws_max_pool_connections,
+            "connect_timeout": settings.aws_connect_timeout,
+            "read_timeout": settings.aws_read_timeout,
+            "tcp_keepalive": settings.aws_tcp_keepalive,
+            "retries": {
+                "max_attempts": settings.aws_max_retry_attempts,
+                "mode": settings.aws_retry_mode
+            }
+        }
+        options.update(overrides)
+        return Config(**options)
+
+    def client(self, service_name: str, config: Optional[Config] = None):
+        """Get a shared low-level client (clients are thread-safe and reused)"""
+        if config is not None:
+            with self._lock:
+                return self.session.client(service_name, config=self.config.merge(config))
+
+        with self._lock:
+            if service_name not in self._clients:
+                self._clients[service_name] = self.session.client(service_name, config=self.config)
+                logger.info(
+                    f"Created {service_name} client (pool={settings.aws_max_pool_connections}, "
+                    f"retries={settings.aws_retry_mode})"
+                )
+            return self._clients[service_name]
+
+    def resource(self, service_name: str, config: Optional[Config] = None):
+        """Create a resource using the tuned config"""
+        merged = self.config.merge(config) if config is not None else self.config
+        with self._lock:
+            return self.session.resource(service_name, config=merged)
+
+# Global instance
+aws_client_factory = AWSClientFactory()
@@ -1,18 +1,13 @@
-import boto3
 import hmac
 import hashlib
 import base64
 from botocore.exceptions import ClientError
 from config import settings
+from services.aws import aws_client_factory
 
 class CognitoService:
     def __init__(self):
-        self.client = boto3.client(
-            'cognito-idp',
-            aws_access_key_id=settings.aws_access_key_id,
-            aws_secret_access_key=settings.aws_secret_access_key,
-            region_name=settings.aws_region
-        )
+        self.client = aws_client_factory.client('cognito-idp')
         self.user_pool_id = settings.cognito_user_pool_id
         self.app_client_id = settings.cognito_app_client_id
         
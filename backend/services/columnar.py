@@ -0,0 +1,62 @@
+from typing import BinaryIO, Iterator, List
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Arrow-native upload formats; both are read through random-access files so only the
+# footer and the needed column chunks / record batches are fetched
+COLUMNAR_FORMATS = ("parquet", "feather")
+
+def _batches(source: BinaryIO, fmt: str, batch_rows: int) -> Iterator[pa.RecordBatch]:
+    if fmt == "parquet":
+        yield from pq.ParquetFile(source).iter_batches(batch_size=batch_rows)
+    elif fmt == "feather":
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+    else:
+        raise ValueError(f"Unknown columnar format '{fmt}'")
+
+def read_table(source: BinaryIO, fmt: str) -> pa.Table:
+    if fmt == "parquet":
+        return pq.read_table(source)
+    if fmt == "feather":
+        return pa.ipc.open_file(source).read_all()
+    raise ValueError(f"Unknown columnar format '{fmt}'")
+
+def read_head(source: BinaryIO, fmt: str, rows: int) -> pa.Table:
+    """First rows of the file, reading only the first batches"""
+    return next(iter_tables(source, fmt, rows), None)
+
+def iter_tables(source: BinaryIO, fmt: str, rows: int) -> Iterator[pa.Table]:
+    """
+    The file as tables of exactly `rows` rows (the last may be shorter), whatever the row group
+    or record batch sizes the writer used. Slices share the batches' buffers.
+    """
+    pending: List[pa.RecordBatch] = []
+    pending_rows = 0
+    for batch in _batches(source, fmt, rows):
+        pending.append(batch)
+        pending_rows += batch.num_rows
+        while pending_rows >= rows:
+            table = pa.Table.from_batches(pending)
+            yield table.slice(0, rows)
+            rest = table.slice(rows)
+            pending = rest.to_batches()
+            pending_rows = rest.num_rows
+    if pending_rows:
+        yield pa.Table.from_batches(pending)
+
+def uncompressed_size(source: BinaryIO, fmt: str, compressed_size: int) -> int:
+    """In-memory size of the data: summed from the Parquet footer, the file size for (usually uncompressed) Feather"""
+    if fmt == "parquet":
+        metadata = pq.ParquetFile(source).metadata
+        return sum(metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups))
+    return compressed_size
+
+def unsupported_columns(schema: pa.Schema) -> List[str]:
+    """Columns whose values can't be profiled like CSV cells (nested or binary data)"""
+    return [
+        field.name for field in schema
+        if pa.types.is_nested(field.type) or pa.types.is_binary(field.type)
+        or pa.types.is_large_binary(field.type) or pa.types.is_fixed_size_binary(field.type)
+    ]
@@ -0,0 +1,73 @@
+from typing import BinaryIO, Optional, Tuple
+import gzip
+import io
+import zlib
+
+# Compressed CSV suffixes and the codec each one is stored with
+COMPRESSION_BY_SUFFIX = {".csv.gz": "gzip", ".csv.zst": "zstd"}
+# Compressed bodies are read from S3 in blocks of this size
+READ_BLOCK_BYTES = 256 * 1024
+
+class DecompressionError(ValueError):
+    """Raised when a compressed upload is corrupt"""
+
+class DecompressedSizeExceeded(DecompressionError):
+    """Raised when a compressed upload inflates past the allowed size"""
+
+def compression_for(file_name: str) -> Optional[str]:
+    """Codec implied by the file name, or None for a plain CSV"""
+    name = file_name.lower()
+    for suffix, compression in COMPRESSION_BY_SUFFIX.items():
+        if name.endswith(suffix):
+            return compression
+    return None
+
+class _LimitedReader(io.RawIOBase):
+    """Raw stream over decompressed bytes that fails once more than `limit` bytes come out"""
+
+    def __init__(self, source, limit: int, errors: Tuple[type, ...]):
+        self.source = source
+        self.limit = limit
+        # Codec-specific exceptions, reported as DecompressionError
+        self.errors = errors
+        self.produced = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        try:
+            data = self.source.read(len(buffer))
+        except self.errors as e:
+            raise DecompressionError(f"File could not be decompressed: {e}") from e
+        self.produced += len(data)
+        if self.produced > self.limit:
+            raise DecompressedSizeExceeded(
+                f"Decompressed file exceeds the {self.limit // (1024 * 1024)}MB limit"
+            )
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self.source.close()
+        super().close()
+
+def open_decompressed(body: BinaryIO, compression: Optional[str], limit: int) -> BinaryIO:
+    """
+    Stream-decompress a body so parsers never hold more than a block of compressed input.
+    Plain bodies are returned unchanged. Reading past `limit` decompressed bytes raises
+    DecompressedSizeExceeded, so a decompression bomb fails early instead of exhausting memory.
+    """
+    if compression is None:
+        return body
+    if compression == "gzip":
+        source = gzip.GzipFile(fileobj=body, mode="rb")
+        errors = (OSError, EOFError, zlib.error)
+    elif compression == "zstd":
+        # Only needed for .csv.zst uploads
+        import zstandard
+        source = zstandard.ZstdDecompressor().stream_reader(body, read_size=READ_BLOCK_BYTES)
+        errors = (zstandard.ZstdError,)
+    else:
+        raise ValueError(f"Unknown compression '{compression}'")
+    return io.BufferedReader(_LimitedReader(source, limit, errors), buffer_size=READ_BLOCK_BYTES)
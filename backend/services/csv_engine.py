@@ -0,0 +1,74 @@
+from typing import Dict, Optional
+import codecs
+import io
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("auto", "pyarrow", "pandas")
+# Bytes inspected to pick an encoding
+ENCODING_SNIFF_BYTES = 64 * 1024
+# pandas' default float parser can be off by one ulp; round-trip parsing matches Arrow's exactly,
+# so the same file gets the same values (and column hashes) whichever reader parsed it
+FLOAT_PRECISION = "round_trip"
+
+def detect_encoding(head: bytes) -> str:
+    """UTF-8 (with or without BOM) when the head decodes as UTF-8, Latin-1 otherwise"""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # Incremental decode so a multi-byte character cut off at the end of the head isn't an error
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+def arrow_to_pandas(table: pa.Table) -> pd.DataFrame:
+    """Convert an Arrow table to the dtypes pandas' CSV reader gives the same data"""
+    for i, field in enumerate(table.schema):
+        # pandas leaves dates as text and types all-empty columns as float
+        if pa.types.is_temporal(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+        elif pa.types.is_null(field.type) or pa.types.is_decimal(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+        elif pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+    # Unconsolidated blocks let null-free numeric columns share Arrow's buffers
+    return table.to_pandas(split_blocks=True)
+
+def _read_with_pyarrow(data: bytes, encoding: str) -> pd.DataFrame:
+    """Multithreaded Arrow reader on the raw bytes, typed the way pandas would type the same file"""
+    table = pa_csv.read_csv(
+        pa.BufferReader(data),
+        read_options=pa_csv.ReadOptions(encoding="utf8" if encoding.startswith("utf-8") else encoding),
+        # Empty strings are missing values in pandas too
+        convert_options=pa_csv.ConvertOptions(strings_can_be_null=True)
+    )
+    return arrow_to_pandas(table)
+
+def _read_with_pandas(data: bytes, encoding: str, dtype: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    return pd.read_csv(io.BytesIO(data), encoding=encoding, dtype=dtype, float_precision=FLOAT_PRECISION)
+
+def read_csv_bytes(data: bytes, engine: str = "auto", dtype: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Parse a whole CSV held in memory without decoding it to a Python string first. The PyArrow
+    engine is used when allowed, falling back to pandas for files Arrow can't parse (ragged rows,
+    unusual quoting). Raises the same pandas errors as pd.read_csv when both fail.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown CSV engine '{engine}'")
+
+    encoding = detect_encoding(data[:ENCODING_SNIFF_BYTES])
+    if engine != "pandas":
+        try:
+            df = _read_with_pyarrow(data, encoding)
+            return df.astype(dtype) if dtype else df
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            if engine == "pyarrow":
+                raise
+            logger.info(f"PyArrow could not parse CSV, falling back to pandas: {e}")
+
+    return _read_with_pandas(data, encoding, dtype)
@@ -0,0 +1,887 @@
+from botocore.exceptions import ClientError
+from config import settings
+from services.s3 import s3_service, SHA256_HEX
+from services.profiler import profile_dataframe, column_hashes, ColumnHasher, StreamingProfiler
+from services.schema import optimize_dtypes
+from services.csv_engine import FLOAT_PRECISION, detect_encoding, read_csv_bytes, arrow_to_pandas
+from services.compression import DecompressionError, compression_for, open_decompressed
+from services.formats import format_for
+from services.columnar import (
+    COLUMNAR_FORMATS, read_table, read_head, iter_tables, uncompressed_size, unsupported_columns
+)
+from services.null_index import NullIndex, NullIndexBuilder
+from services.sampling import representative_sample
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+import logging
+import threading
+import base64
+import hashlib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Bump when the profile layout changes so stale profiles get recomputed
+PROFILE_VERSION = 7
+# Validation reads the upload in chunks of this size and stops after the sample rows
+VALIDATION_CHUNK_BYTES = 64 * 1024
+VALIDATION_SAMPLE_ROWS = 50
+MIN_DATASET_ROWS = 5
+# Files above the in-memory limit are profiled in chunks of this many rows (a multiple of 8,
+# so each chunk's null bitmap packs into whole bytes)
+STREAMING_CHUNK_ROWS = 100_000
+# Artifacts shared by every upload with the same bytes live under {CONTENT_PREFIX}{sha256}/
+CONTENT_PREFIX = "datasets/sha256/"
+HASH_CHUNK_BYTES = 1024 * 1024
+# Sidecar row groups are kept small so a page of rows only fetches the groups it overlaps
+SIDECAR_ROW_GROUP_ROWS = 64 * 1024
+MAX_PAGE_ROWS = 1000
+# Uploads without a fingerprint object are remembered this long; the upload pipeline, possibly in
+# another process, fingerprints new uploads shortly after they are confirmed
+HASH_MISS_TTL_SECONDS = 30.0
+
+def _has_fractions(series: pd.Series) -> bool:
+    """Whether a float column holds values that don't fit an integer column"""
+    if not pd.api.types.is_float_dtype(series.dtype):
+        return False
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return not np.all(np.isnan(values) | (np.mod(values, 1) == 0))
+
+class DatasetTooLargeError(ValueError):
+    """Raised when an uploaded dataset exceeds the allowed size"""
+
+class DatasetService:
+    """Loads uploaded datasets from S3 and keeps parsed DataFrames in a memory-budgeted LRU"""
+
+    def __init__(self):
+        self.s3 = s3_service
+        self.max_cache_bytes = settings.dataset_cache_max_bytes
+        # (key, etag, columns) -> (DataFrame, size in bytes), most recently used last
+        self._cache: "OrderedDict[Tuple, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._cache_bytes = 0
+        # file_key -> dataset profile (small JSON documents)
+        self._profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # (sidecar key, etag) -> Parquet footer, so paging doesn't re-read it
+        self._footers: "OrderedDict[Tuple[str, str], pq.FileMetaData]" = OrderedDict()
+        # file_key -> null bitmaps (a few bits per cell, so fewer are kept)
+        self._null_indexes: "OrderedDict[str, NullIndex]" = OrderedDict()
+        # file_key -> SHA-256 of its bytes, or the time.monotonic() deadline of a cached miss
+        self._hashes: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _head(self, file_key: str) -> Dict[str, Any]:
+        return self.s3.s3_client.head_object(Bucket=self.s3.bucket_name, Key=file_key)
+
+    def _parse(self, file_content: bytes, schema: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+        """Parse a CSV into compact dtypes, reusing a persisted schema instead of re-inferring it"""
+        if schema:
+            try:
+                return read_csv_bytes(file_content, settings.csv_engine, dtype=schema)
+            except (ValueError, TypeError):
+                logger.info("Persisted schema no longer matches the data, re-inferring dtypes")
+        return optimize_dtypes(read_csv_bytes(file_content, settings.csv_engine))[0]
+
+    def _text_stream(self, body) -> io.TextIOWrapper:
+        """Buffered text view of a streamed S3 body, decoded with the encoding sniffed from its head"""
+        buffered = io.BufferedReader(body, buffer_size=VALIDATION_CHUNK_BYTES)
+        return io.TextIOWrapper(buffered, encoding=detect_encoding(buffered.peek(VALIDATION_CHUNK_BYTES)))
+
+    def _open_csv(self, file_key: str, head: Dict[str, Any]):
+        """Streamed S3 body of an upload plus a binary view of its CSV bytes, decompressed on the fly"""
+        response = self.s3.s3_client.get_object(Bucket=self.s3.bucket_name, Key=file_key, IfMatch=head['ETag'])
+        body = response['Body']
+        return body, open_decompressed(body, compression_for(file_key), settings.max_decompressed_size)
+
+    def _read_csv_content(self, file_key: str, head: Dict[str, Any], limit: int) -> Optional[bytes]:
+        """Whole (decompressed) CSV bytes, or None when they exceed `limit`"""
+        body, stream = self._open_csv(file_key, head)
+        try:
+            content = stream.read(limit + 1)
+        finally:
+            body.close()
+        return content if len(content) <= limit else None
+
+    def _iter_chunks(self, file_key: str, head: Dict[str, Any]) -> Iterator[pd.DataFrame]:
+        """The dataset as DataFrames of STREAMING_CHUNK_ROWS rows (the last may be shorter)"""
+        fmt = format_for(file_key)
+        if fmt in COLUMNAR_FORMATS:
+            for table in iter_tables(self.s3.open_object(file_key, head), fmt, STREAMING_CHUNK_ROWS):
+                yield arrow_to_pandas(table)
+            return
+
+        body, stream = self._open_csv(file_key, head)
+        try:
+            with pd.read_csv(self._text_stream(stream), chunksize=STREAMING_CHUNK_ROWS, float_precision=FLOAT_PRECISION) as reader:
+                yield from reader
+        finally:
+            body.close()
+
+    def _load_in_memory(self, file_key: str, head: Dict[str, Any]) -> Optional[pd.DataFrame]:
+        """
+        The parsed dataset, or None when it is too large to parse in memory. CSVs are read once
+        and the limit is checked against the (decompressed) bytes read, inflating compressed files
+        at most up to the limit; Parquet files are measured from their footer.
+        """
+        key = (file_key, head['ETag'], None)
+        df = self._cache_get(key)
+        if df is not None:
+            return df
+
+        fmt = format_for(file_key)
+        if fmt in COLUMNAR_FORMATS:
+            size = uncompressed_size(self.s3.open_object(file_key, head), fmt, head['ContentLength'])
+            if size > self.s3.max_file_size:
+                return None
+            # Arrow files carry their own types; they only need downcasting
+            df = optimize_dtypes(arrow_to_pandas(read_table(self.s3.open_object(file_key, head), fmt)))[0]
+        else:
+            if head['ContentLength'] > self.s3.max_file_size:
+                return None
+            content = self._read_csv_content(file_key, head, self.s3.max_file_size)
+            if content is None:
+                return None
+            df = self._parse(content, self._persisted_schema(file_key))
+        self._cache_put(key, df)
+        return df
+
+    def _persisted_schema(self, file_key: str) -> Optional[Dict[str, str]]:
+        """Column dtypes recorded in an already loaded exact profile"""
+        with self._lock:
+            profile = self._profiles.get(file_key)
+        if profile and profile.get("profileMode") == "exact":
+            return profile["dtypes"]
+        return None
+
+    def _is_missing(self, error: ClientError) -> bool:
+        return error.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound')
+
+    def fingerprint_key(self, file_key: str) -> str:
+        """S3 key of the small object recording an upload's content hash"""
+        return f"{file_key}.sha256"
+
+    def content_key(self, content_hash: str, name: str) -> str:
+        """S3 key of an artifact shared by every upload of the same bytes"""
+        return f"{CONTENT_PREFIX}{content_hash}/{name}"
+
+    def source_key(self, user_email: str, content_hash: str) -> str:
+        """
+        S3 key recording one of the user's own uploads of these bytes. It lives under the user's
+        prefix so shared artifacts never name an upload, and reuse can't reach another user's files.
+        """
+        return f"projects/{user_email}/sha256/{content_hash}.json"
+
+    def _remember_hash(self, file_key: str, content_hash: Any):
+        with self._lock:
+            self._hashes[file_key] = content_hash
+            self._hashes.move_to_end(file_key)
+            while len(self._hashes) > 4096:
+                self._hashes.popitem(last=False)
+
+    def content_hash(self, file_key: str) -> Optional[str]:
+        """SHA-256 recorded for an upload, None for uploads that were never fingerprinted"""
+        with self._lock:
+            content_hash = self._hashes.get(file_key)
+        if isinstance(content_hash, str):
+            return content_hash
+        if content_hash is not None and time.monotonic() < content_hash:
+            return None
+
+        try:
+            response = self.s3.s3_client.get_object(Bucket=self.s3.bucket_name, Key=self.fingerprint_key(file_key))
+        except ClientError as e:
+            if not self._is_missing(e):
+                raise
+            self._remember_hash(file_key, time.monotonic() + HASH_MISS_TTL_SECONDS)
+            return None
+        content_hash = response['Body'].read().decode('ascii')
+        self._remember_hash(file_key, content_hash)
+        return content_hash
+
+    def link_content(self, file_key: str, content_hash: str):
+        """Record an upload's content hash and register it as its owner's source for those bytes"""
+        self.s3.s3_client.put_object(
+            Bucket=self.s3.bucket_name,
+            Key=self.fingerprint_key(file_key),
+            Body=content_hash.encode('ascii'),
+            ContentType='text/plain'
+        )
+        parts = file_key.split("/")
+        if len(parts) > 3 and parts[0] == "projects":
+            self.s3.s3_client.put_object(
+                Bucket=self.s3.bucket_name,
+                Key=self.source_key(parts[1], content_hash),
+                Body=json.dumps({"fileKey": file_key}).encode('utf-8'),
+                ContentType='application/json'
+            )
+        self._remember_hash(file_key, content_hash)
+
+    def fingerprint(self, file_key: str) -> str:
+        """
+        SHA-256 of an upload. Uses the checksum S3 verified on upload when the client sent one,
+        otherwise hashes the object in a single streamed read.
+        """
+        # A cached miss may predate a fingerprint written by another process
+        with self._lock:
+            if not isinstance(self._hashes.get(file_key, ""), str):
+                del self._hashes[file_key]
+        content_hash = self.content_hash(file_key)
+        if content_hash is not None:
+            return content_hash
+
+        head = self.s3.s3_client.head_object(Bucket=self.s3.bucket_name, Key=file_key, ChecksumMode='ENABLED')
+        checksum = head.get('ChecksumSHA256')
+        # Multipart uploads carry a checksum of part checksums ("...-N"), not of the whole object
+        if checksum and '-' not in checksum and head.get('ChecksumType', 'FULL_OBJECT') == 'FULL_OBJECT':
+            content_hash = base64.b64decode(checksum).hex()
+        else:
+            digest = hashlib.sha256()
+            response = self.s3.s3_client.get_object(Bucket=self.s3.bucket_name, Key=file_key, IfMatch=head['ETag'])
+            for chunk in response['Body'].iter_chunks(HASH_CHUNK_BYTES):
+                digest.update(chunk)
+            content_hash = digest.hexdigest()
+
+        self.link_content(file_key, content_hash)
+        logger.info(f"Fingerprinted {file_key} as {content_hash}")
+        return content_hash
+
+    def find_source(self, user_email: str, content_hash: str) -> Optional[str]:
+        """One of the user's own uploads with these bytes, if it is still stored"""
+        if not SHA256_HEX.match(content_hash):
+            return None
+        try:
+            response = self.s3.s3_client.get_object(
+                Bucket=self.s3.bucket_name, Key=self.source_key(user_email, content_hash)
+            )
+            file_key = json.loads(response['Body'].read())["fileKey"]
+            if not file_key.startswith(f"projects/{user_email}/"):
+                return None
+            self._head(file_key)
+            return file_key
+        except ClientError as e:
+            if not self._is_missing(e):
+                logger.error(f"Error looking up dataset {content_hash}: {e}")
+            return None
+
+    def sidecar_key(self, file_key: str) -> str:
+        """S3 key of the typed Parquet copy, shared by uploads of the same bytes once fingerprinted"""
+        content_hash = self.content_hash(file_key)
+        if content_hash is not None:
+            return self.content_key(content_hash, "data.parquet")
+        return f"{file_key}.parquet"
+
+    def _cache_get(self, key: Tuple) -> Optional[pd.DataFrame]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            self._cache.move_to_end(key)
+            return entry[0]
+
+    def _cache_put(self, key: Tuple, df: pd.DataFrame):
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_cache_bytes:
+            logger.info(f"Dataset {key[0]} ({size} bytes) exceeds cache budget, not caching")
+            return
+
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = (df, size)
+            self._cache_bytes += size
+            while self._cache_bytes > self.max_cache_bytes:
+                evicted_key, (_, evicted_size) = self._cache.popitem(last=False)
+                self._cache_bytes -= evicted_size
+                logger.info(f"Evicted dataset {evicted_key[0]} from cache")
+
+    def invalidate(self, file_key: str):
+        """Drop every cached version of a dataset and its sidecar"""
+        keys = (file_key, self.sidecar_key(file_key))
+        with self._lock:
+            for key in [k for k in self._cache if k[0] in keys]:
+                _, size = self._cache.pop(key)
+                self._cache_bytes -= size
+
+    def load_dataframe(self, file_key: str) -> pd.DataFrame:
+        """
+        Return the parsed dataset for an S3 key, fetching and parsing it at most once per ETag.
+        The returned DataFrame is shared between callers and must be treated as read-only.
+        """
+        df = self._load_in_memory(file_key, self._head(file_key))
+        if df is None:
+            raise DatasetTooLargeError(
+                f"File size exceeds the {self.s3.max_file_size // (1024 * 1024)}MB in-memory processing limit"
+            )
+        return df
+
+    def write_parquet_sidecar(self, file_key: str, df: Optional[pd.DataFrame] = None) -> bool:
+        """Convert an accepted upload (or its already parsed frame) to Parquet once so later reads skip CSV parsing"""
+        try:
+            if df is None:
+                df = self.load_dataframe(file_key)
+            try:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Mixed-type object columns can't be typed by Arrow; store them as strings
+                mixed = {col: df[col].astype("string") for col in df.select_dtypes(include="object").columns}
+                table = pa.Table.from_pandas(df.assign(**mixed), preserve_index=False)
+
+            buffer = io.BytesIO()
+            pq.write_table(table, buffer, compression='zstd', row_group_size=SIDECAR_ROW_GROUP_ROWS)
+            self.s3.s3_client.put_object(
+                Bucket=self.s3.bucket_name,
+                Key=self.sidecar_key(file_key),
+                Body=buffer.getvalue(),
+                ContentType='application/vnd.apache.parquet'
+            )
+            logger.info(f"Wrote Parquet sidecar for {file_key} ({buffer.tell()} bytes)")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error writing Parquet sidecar for {file_key}: {e}")
+            return False
+
+    def load_columns(self, file_key: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Load only the requested columns (all when None), reading the Parquet sidecar with ranged GETs.
+        Falls back to the CSV for uploads that predate sidecars. Treat the result as read-only.
+        """
+        sidecar = self.sidecar_key(file_key)
+        try:
+            head = self._head(sidecar)
+        except ClientError as e:
+            if not self._is_missing(e):
+                raise
+            df = self.load_dataframe(file_key)
+            return df if columns is None else df[columns]
+
+        key = (sidecar, head['ETag'], tuple(columns) if columns is not None else None)
+        df = self._cache_get(key)
+        if df is not None:
+            return df
+
+        with self.s3.open_object(sidecar, head=head) as f:
+            df = pq.read_table(f, columns=columns).to_pandas()
+        self._cache_put(key, df)
+        return df
+
+    def _sidecar_footer(self, sidecar: str, head: Dict[str, Any], f) -> pq.FileMetaData:
+        key = (sidecar, head['ETag'])
+        with self._lock:
+            metadata = self._footers.get(key)
+        if metadata is None:
+            metadata = pq.read_metadata(f)
+            with self._lock:
+                self._footers[key] = metadata
+                while len(self._footers) > 256:
+                    self._footers.popitem(last=False)
+        return metadata
+
+    def read_rows(self, file_key: str, offset: int, limit: int,
+                  columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        One page of rows as column-oriented JSON. Only the sidecar row groups overlapping
+        [offset, offset + limit) are fetched, so deep pages cost the same as the first.
+        Raises KeyError for unknown columns.
+        """
+        limit = max(0, min(limit, MAX_PAGE_ROWS))
+        offset = max(0, offset)
+        sidecar = self.sidecar_key(file_key)
+        try:
+            head = self._head(sidecar)
+        except ClientError as e:
+            if not self._is_missing(e):
+                raise
+            head = None
+
+        if head is None:
+            # Uploads that predate sidecars
+            df = self.load_columns(file_key)
+            names = list(df.columns) if columns is None else columns
+            missing = [col for col in names if col not in df.columns]
+            if missing:
+                raise KeyError(", ".join(missing))
+            total_rows = len(df)
+            page = df[names].iloc[offset:offset + limit]
+        else:
+            with self.s3.open_object(sidecar, head=head) as f:
+                metadata = self._sidecar_footer(sidecar, head, f)
+                schema_names = metadata.schema.to_arrow_schema().names
+                names = [n for n in schema_names if n != '__index_level_0__'] if columns is None else columns
+                missing = [col for col in names if col not in schema_names]
+                if missing:
+                    raise KeyError(", ".join(missing))
+
+                total_rows = metadata.num_rows
+                groups = []
+                first_row = None
+                start = 0
+                for i in range(metadata.num_row_groups):
+                    end = start + metadata.row_group(i).num_rows
+                    if end > offset and start < offset + limit:
+                        groups.append(i)
+                        first_row = start if first_row is None else first_row
+                    start = end
+
+                if groups:
+                    table = pq.ParquetFile(f, metadata=metadata).read_row_groups(groups, columns=names)
+                    page = table.slice(offset - first_row, limit).to_pandas()
+                else:
+                    page = pd.DataFrame(columns=names)
+
+        return {
+            "totalRows": total_rows,
+            "offset": offset,
+            "limit": limit,
+            "columns": names,
+            # JSON round-trip turns NaN into null
+            "data": {col: json.loads(page[col].to_json(orient='values', date_format='iso')) for col in names}
+        }
+
+    def load_row_sample(self, file_key: str, max_rows: int) -> pd.DataFrame:
+        """
+        All rows when the dataset has at most max_rows, otherwise evenly spaced sidecar row groups
+        totalling about max_rows, so statistics see the whole file without loading all of it.
+        """
+        sidecar = self.sidecar_key(file_key)
+        try:
+            head = self._head(sidecar)
+        except ClientError as e:
+            if not self._is_missing(e):
+                raise
+            return self.load_columns(file_key)
+
+        with self.s3.open_object(sidecar, head=head) as f:
+            metadata = self._sidecar_footer(sidecar, head, f)
+            if metadata.num_rows > max_rows and metadata.num_row_groups > 1:
+                group_rows = metadata.num_rows / metadata.num_row_groups
+                wanted = max(1, int(max_rows // group_rows))
+                groups = sorted({round(i * (metadata.num_row_groups - 1) / max(wanted - 1, 1)) for i in range(wanted)})
+                return pq.ParquetFile(f, metadata=metadata).read_row_groups(groups).to_pandas()
+        return self.load_columns(file_key)
+
+    def _read_csv_sample(self, body, sample_rows: int) -> Optional[pd.DataFrame]:
+        """Parse only the first rows of a streamed CSV body; memory stays a few chunks in size"""
+        with pd.read_csv(self._text_stream(body), chunksize=sample_rows) as reader:
+            return next(reader, None)
+
+    def _read_columnar_sample(self, file_key: str, head: Dict[str, Any], fmt: str,
+                              sample_rows: int) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+        """First rows of a Parquet/Feather upload (only the first batches are fetched), or an error message"""
+        try:
+            table = read_head(self.s3.open_object(file_key, head), fmt, sample_rows)
+        except (pa.ArrowInvalid, OSError) as e:
+            return None, f"File is not a valid {fmt.capitalize()} file: {str(e)}"
+        if table is None:
+            return None, None
+        unsupported = unsupported_columns(table.schema)
+        if unsupported:
+            return None, f"Nested or binary columns are not supported: {', '.join(unsupported)}"
+        return arrow_to_pandas(table), None
+
+    def validate_and_process_csv(self, file_key: str) -> Tuple[bool, str, Optional[List[Dict[str, Any]]]]:
+        """Validate a CSV, Parquet or Feather upload by reading only its head, return sample data"""
+        try:
+            # Reject oversized files from metadata alone, before downloading anything
+            head = self._head(file_key)
+            if head['ContentLength'] > self.s3.max_upload_size:
+                return False, f"File size exceeds {self.s3.max_upload_size // (1024 * 1024)}MB limit", None
+
+            fmt = format_for(file_key)
+            if fmt in COLUMNAR_FORMATS:
+                label = fmt.capitalize()
+                df, error = self._read_columnar_sample(file_key, head, fmt, VALIDATION_SAMPLE_ROWS)
+                if error:
+                    return False, error, None
+            else:
+                label = "CSV"
+                body, stream = self._open_csv(file_key, head)
+                try:
+                    df = self._read_csv_sample(stream, VALIDATION_SAMPLE_ROWS)
+                except DecompressionError as e:
+                    return False, str(e), None
+                except pd.errors.EmptyDataError:
+                    return False, "CSV file is empty or invalid", None
+                except pd.errors.ParserError as e:
+                    return False, f"CSV parsing error: {str(e)}", None
+                except UnicodeDecodeError:
+                    return False, "File encoding not supported. Please use UTF-8 encoded CSV", None
+                finally:
+                    # Stop the download once the sample has been read
+                    body.close()
+
+            # Basic validation
+            if df is None or df.empty:
+                return False, f"{label} file is empty", None
+
+            if len(df.columns) < 2:
+                return False, f"{label} must have at least 2 columns", None
+
+            # Check for reasonable number of rows
+            if len(df) < MIN_DATASET_ROWS:
+                return False, f"{label} must have at least 5 rows of data", None
+
+            # Sample data (first 50 rows) as a list of dictionaries
+            sample_data = df.to_dict('records')
+
+            return True, f"{label} validation successful", sample_data
+
+        except ClientError as e:
+            logger.error(f"Error processing CSV from S3: {e}")
+            return False, f"Failed to process file: {str(e)}", None
+        except Exception as e:
+            logger.error(f"Unexpected error processing CSV: {e}")
+            return False, f"Unexpected error: {str(e)}", None
+
+    def profile_key(self, file_key: str) -> str:
+        """S3 key of the persisted dataset profile, shared like the sidecar"""
+        content_hash = self.content_hash(file_key)
+        if content_hash is not None:
+            return self.content_key(content_hash, "profile.json")
+        return f"{file_key}.profile.json"
+
+    def _validation_digest(self, context: str) -> str:
+        return hashlib.sha256(context.encode('utf-8')).hexdigest()[:16]
+
+    def get_validation(self, file_key: str, context: str) -> Optional[Tuple[bool, str]]:
+        """
+        Stored AI verdict for these bytes. The verdict depends on the project goals as well,
+        so verdicts are kept per content hash and project context.
+        """
+        content_hash = self.content_hash(file_key)
+        if content_hash is None:
+            return None
+        try:
+            response = self.s3.s3_client.get_object(
+                Bucket=self.s3.bucket_name, Key=self.content_key(content_hash, "validation.json")
+            )
+            verdict = json.loads(response['Body'].read()).get(self._validation_digest(context))
+        except ClientError as e:
+            if not self._is_missing(e):
+                logger.error(f"Error reading validation verdict: {e}")
+            return None
+        return (verdict["isValid"], verdict["message"]) if verdict else None
+
+    def save_validation(self, file_key: str, context: str, is_valid: bool, message: str):
+        content_hash = self.content_hash(file_key)
+        if content_hash is None:
+            return
+        key = self.content_key(content_hash, "validation.json")
+        try:
+            try:
+                verdicts = json.loads(self.s3.s3_client.get_object(Bucket=self.s3.bucket_name, Key=key)['Body'].read())
+            except ClientError as e:
+                if not self._is_missing(e):
+                    raise
+                verdicts = {}
+            verdicts[self._validation_digest(context)] = {"isValid": is_valid, "message": message}
+            self.s3.s3_client.put_object(
+                Bucket=self.s3.bucket_name,
+                Key=key,
+                Body=json.dumps(verdicts).encode('utf-8'),
+                ContentType='application/json'
+            )
+        except ClientError as e:
+            logger.error(f"Error saving validation verdict: {e}")
+
+    def _cache_profile(self, file_key: str, profile: Dict[str, Any]):
+        with self._lock:
+            self._profiles[file_key] = profile
+            self._profiles.move_to_end(file_key)
+            while len(self._profiles) > 256:
+                self._profiles.popitem(last=False)
+
+    def null_index_key(self, file_key: str) -> str:
+        """S3 key of the persisted per-column null bitmaps, shared like the sidecar"""
+        content_hash = self.content_hash(file_key)
+        if content_hash is not None:
+            return self.content_key(content_hash, "nulls.npz")
+        return f"{file_key}.nulls.npz"
+
+    def _cache_null_index(self, file_key: str, index: NullIndex):
+        with self._lock:
+            self._null_indexes[file_key] = index
+            self._null_indexes.move_to_end(file_key)
+            while len(self._null_indexes) > 32:
+                self._null_indexes.popitem(last=False)
+
+    def _store_null_index(self, file_key: str, index: NullIndex):
+        self.s3.s3_client.put_object(
+            Bucket=self.s3.bucket_name,
+            Key=self.null_index_key(file_key),
+            Body=index.to_bytes(),
+            ContentType='application/octet-stream'
+        )
+        self._cache_null_index(file_key, index)
+
+    def get_null_index(self, file_key: str) -> NullIndex:
+        """Null bitmaps of a dataset, built from the sidecar for uploads profiled before they existed"""
+        with self._lock:
+            index = self._null_indexes.get(file_key)
+        if index is not None:
+            return index
+
+        try:
+            response = self.s3.s3_client.get_object(Bucket=self.s3.bucket_name, Key=self.null_index_key(file_key))
+            index = NullIndex.from_bytes(response['Body'].read())
+            self._cache_null_index(file_key, index)
+            return index
+        except ClientError as e:
+            if not self._is_missing(e):
+                raise
+
+        index = NullIndex.from_frame(self.load_columns(file_key))
+        self._store_null_index(file_key, index)
+        return index
+
+    def _widen_sidecar(self, spool, schema: pa.Schema, columns: List[str]):
+        """
+        Rewrite a spooled sidecar with the given integer columns widened to float64, once a later
+        chunk holds fractional values for them. Returns the new spool, an open writer and schema.
+        """
+        metadata = schema.pandas_metadata
+        for entry in metadata["columns"]:
+            if entry["name"] in columns:
+                entry.update(pandas_type="float64", numpy_type="float64")
+        for name in columns:
+            i = schema.get_field_index(name)
+            schema = schema.set(i, schema.field(i).with_type(pa.float64()))
+        schema = schema.with_metadata({b"pandas": json.dumps(metadata).encode('utf-8')})
+
+        widened = tempfile.NamedTemporaryFile(suffix='.parquet')
+        writer = pq.ParquetWriter(widened.name, schema, compression='zstd')
+        spooled = pq.ParquetFile(spool.name)
+        for i in range(spooled.num_row_groups):
+            writer.write_table(spooled.read_row_group(i).cast(schema), row_group_size=SIDECAR_ROW_GROUP_ROWS)
+        spool.close()
+        return widened, writer, schema
+
+    def _stream_profile(self, file_key: str, head: Dict[str, Any], write_sidecar: bool,
+                        hash_columns: bool = False) -> Tuple[Dict[str, Any], NullIndex, List[Dict[str, Any]]]:
+        """
+        Profile a file too large to load in one streamed pass over its rows, optionally writing the
+        Parquet sidecar from the same chunks. The sidecar schema is fixed by the first chunk, with
+        integers stored as nullable int64 and text as strings since later chunks may hold nulls; an
+        integer column is only widened to float64 when a later chunk holds fractional values.
+        The prompt sample is drawn from the representative rows of every chunk.
+        """
+        profiler = StreamingProfiler(hash_columns=hash_columns)
+        nulls = NullIndexBuilder()
+        candidates: List[Dict[str, Any]] = []
+        writer = None
+        schema = None
+        text_columns: List[str] = []
+        int_columns: List[str] = []
+        spool = tempfile.NamedTemporaryFile(suffix='.parquet') if write_sidecar else None
+
+        for chunk in self._iter_chunks(file_key, head):
+            profiler.update(chunk)
+            nulls.update(chunk)
+            candidates.extend(representative_sample(chunk))
+            if spool is None:
+                continue
+
+            try:
+                if schema is None:
+                    text_columns = list(chunk.select_dtypes(include="object").columns)
+                    int_columns = [col for col in chunk.columns if pd.api.types.is_integer_dtype(chunk[col].dtype)]
+                    chunk = chunk.astype({
+                        **{col: "string" for col in text_columns}, **{col: "Int64" for col in int_columns}
+                    })
+                    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                    writer = pq.ParquetWriter(spool.name, schema, compression='zstd')
+                else:
+                    # Chunks with missing values read integer columns as float
+                    fractional = [col for col in int_columns if _has_fractions(chunk[col])]
+                    if fractional:
+                        writer.close()
+                        spool, writer, schema = self._widen_sidecar(spool, schema, fractional)
+                        int_columns = [col for col in int_columns if col not in fractional]
+                    chunk = chunk.astype({
+                        **{col: "string" for col in text_columns}, **{col: "Int64" for col in int_columns}
+                    })
+                writer.write_table(
+                    pa.Table.from_pandas(chunk, schema=schema, preserve_index=False),
+                    row_group_size=SIDECAR_ROW_GROUP_ROWS
+                )
+            except (ValueError, TypeError) as e:
+                # A column changed type mid-file; keep profiling but give up on the sidecar
+                logger.error(f"Error writing Parquet sidecar for {file_key}: {e}")
+                if writer is not None:
+                    writer.close()
+                writer = None
+                spool.close()
+                spool = None
+
+        if writer is not None:
+            writer.close()
+            self.s3.s3_client.upload_file(
+                spool.name,
+                self.s3.bucket_name,
+                self.sidecar_key(file_key),
+                ExtraArgs={'ContentType': 'application/vnd.apache.parquet'}
+            )
+            logger.info(f"Wrote Parquet sidecar for {file_key} ({os.path.getsize(spool.name)} bytes)")
+        if spool is not None:
+            spool.close()
+
+        return profiler.result(), nulls.build(), representative_sample(pd.DataFrame(candidates))
+
+    def compute_profile(self, file_key: str, write_sidecar: bool = False,
+                        previous: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Profile a dataset once and persist the result as JSON next to the upload. Files above the
+        in-memory limit are profiled in a single streamed pass with approximate sketches. Given the
+        profile of the dataset this upload replaces, unchanged columns keep their statistics.
+        """
+        try:
+            head = self._head(file_key)
+            df = self._load_in_memory(file_key, head)
+            if df is None:
+                profile, null_index, prompt_sample = self._stream_profile(
+                    file_key, head, write_sidecar, hash_columns=previous is not None
+                )
+            else:
+                # The frame the sidecar is written from is profiled directly, not read back
+                if write_sidecar:
+                    self.write_parquet_sidecar(file_key, df)
+                profile = profile_dataframe(df, previous=previous)
+                null_index = NullIndex.from_frame(df)
+                prompt_sample = representative_sample(df)
+            self._store_null_index(file_key, null_index)
+            profile["promptSample"] = prompt_sample
+            profile["profileVersion"] = PROFILE_VERSION
+            profile["contentHash"] = self.content_hash(file_key)
+            profile["createdAt"] = datetime.utcnow().isoformat()
+
+            self._store_profile(file_key, profile)
+            logger.info(
+                f"Stored {profile['profileMode']} dataset profile for {file_key} "
+                f"({len(profile['reprofiledColumns'])} of {profile['columnCount']} columns profiled)"
+            )
+            return profile
+
+        except Exception as e:
+            logger.error(f"Error computing dataset profile for {file_key}: {e}")
+            return None
+
+    def _store_profile(self, file_key: str, profile: Dict[str, Any]):
+        self.s3.s3_client.put_object(
+            Bucket=self.s3.bucket_name,
+            Key=self.profile_key(file_key),
+            Body=json.dumps(profile).encode('utf-8'),
+            ContentType='application/json'
+        )
+        self._cache_profile(file_key, profile)
+
+    def column_hashes(self, file_key: str) -> Optional[Dict[str, str]]:
+        """
+        Per-column content hashes of a dataset. Only re-uploads compute them while profiling, so
+        for other uploads they are computed on first use and added to the stored profile.
+        """
+        profile = self.get_profile(file_key)
+        if profile is None:
+            return None
+        if "columnHashes" not in profile:
+            head = self._head(file_key)
+            df = self._load_in_memory(file_key, head)
+            if df is None:
+                hasher = ColumnHasher()
+                for chunk in self._iter_chunks(file_key, head):
+                    hasher.update(chunk)
+                hashes = hasher.result()
+            else:
+                hashes = column_hashes(df)
+            profile = {**profile, "columnHashes": hashes}
+            self._store_profile(file_key, profile)
+        return profile["columnHashes"]
+
+    def _read_profile(self, file_key: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Persisted current profile, plus whether a read error (not just absence) occurred"""
+        try:
+            response = self.s3.s3_client.get_object(Bucket=self.s3.bucket_name, Key=self.profile_key(file_key))
+            profile = json.loads(response['Body'].read())
+            if profile.get("profileVersion") == PROFILE_VERSION:
+                self._cache_profile(file_key, profile)
+                return profile, False
+            logger.info(f"Profile for {file_key} is outdated, recomputing")
+        except ClientError as e:
+            if not self._is_missing(e):
+                logger.error(f"Error reading dataset profile: {e}")
+                return None, True
+        return None, False
+
+    def get_profile(self, file_key: str) -> Optional[Dict[str, Any]]:
+        """Read the persisted profile, computing it for uploads that don't have a current one yet"""
+        with self._lock:
+            profile = self._profiles.get(file_key)
+        if profile is not None:
+            return profile
+
+        profile, failed = self._read_profile(file_key)
+        if profile is not None or failed:
+            return profile
+        return self.compute_profile(file_key)
+
+    def process_upload(self, file_key: str, previous_file_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Build the artifacts every later step reads: Parquet sidecar and dataset profile. Both are
+        stored once per content hash, so re-uploads of known bytes reuse them without parsing.
+        When the upload replaces an earlier dataset, only its changed columns are re-profiled.
+        """
+        try:
+            self.fingerprint(file_key)
+            profile, _ = self._read_profile(file_key)
+            if profile is not None:
+                self._head(self.sidecar_key(file_key))
+                logger.info(f"Reusing profile and sidecar of {profile['contentHash']} for {file_key}")
+                return profile
+        except ClientError as e:
+            if not self._is_missing(e):
+                logger.error(f"Error looking up shared artifacts for {file_key}: {e}")
+
+        previous = None
+        if previous_file_key and previous_file_key != file_key:
+            try:
+                previous, _ = self._read_profile(previous_file_key)
+                if previous is not None:
+                    previous = {**previous, "columnHashes": self.column_hashes(previous_file_key)}
+            except Exception as e:
+                logger.error(f"Error hashing previous dataset {previous_file_key}, profiling all columns: {e}")
+                previous = None
+        return self.compute_profile(file_key, write_sidecar=True, previous=previous)
+
+    def get_sample_rows(self, file_key: str) -> Optional[List[Dict[str, Any]]]:
+        """First rows of the dataset (up to 50) from the profile"""
+        profile = self.get_profile(file_key)
+        return profile["sampleRows"] if profile else None
+
+    def get_prompt_sample(self, file_key: str) -> Optional[List[Dict[str, Any]]]:
+        """Token-budgeted representative rows from the profile, for LLM prompts"""
+        profile = self.get_profile(file_key)
+        return profile["promptSample"] if profile else None
+
+    def get_dataset_summary(self, file_key: str, preview_rows: int = 5) -> Optional[Dict[str, Any]]:
+        """Generate comprehensive dataset summary"""
+        profile = self.get_profile(file_key)
+        if not profile:
+            return None
+
+        return {
+            "rowCount": profile["rowCount"],
+            "columnCount": profile["columnCount"],
+            "columns": profile["columns"],
+            "missingValues": profile["nullCounts"],
+            "dataPreview": profile["sampleRows"][:preview_rows]
+        }
+
+# Global instance
+dataset_service = DatasetService()
@@ -0,0 +1,198 @@
+from botocore.exceptions import ClientError
+from services.dataset import dataset_service, PROFILE_VERSION
+from services.dynamodb import dynamodb_service
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+import hashlib
+import json
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Older versions are dropped from the project's history beyond this many
+MAX_VERSIONS = 20
+# What each stored question was built from: "schema" (column names and
+# dtypes), "target" / "features" (the columns chosen at 2/2 and 3/0), plus the earlier answers
+# it reads. Questions not listed (project idea, normalization, train split) don't depend on the data
+# but are still cleared when they come after a stale one. The summary step (2/1) stores no choice;
+# its dataset summary lives in the LLM context, which is rebuilt for every new version.
+QUESTION_DEPENDENCIES: Dict[Tuple[int, int], Dict[str, List]] = {
+    (2, 2): {"data": ["schema"], "answers": []},
+    (2, 3): {"data": ["target"], "answers": [(2, 2)]},
+    (3, 0): {"data": ["schema", "target", "features"], "answers": [(2, 2)]},
+    (3, 1): {"data": ["target", "features"], "answers": [(2, 2), (3, 0)]},
+    (3, 3): {"data": ["target"], "answers": [(2, 2), (2, 3)]},
+    (4, 1): {"data": [], "answers": [(2, 3)]},
+    (4, 2): {"data": [], "answers": [(4, 1)]},
+    (4, 3): {"data": ["schema", "target", "features"], "answers": [(3, 0), (3, 1), (3, 3), (4, 1), (4, 2)]},
+}
+
+def schema_hash(dtypes: Dict[str, str]) -> str:
+    """Hash of the column names, order and dtypes"""
+    return hashlib.sha256(json.dumps(list(dtypes.items())).encode('utf-8')).hexdigest()[:32]
+
+def diff_versions(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Columns added, removed and changed (any value or the dtype) between two dataset versions"""
+    before = previous["columnHashes"]
+    after = current["columnHashes"]
+    changed = [col for col in after if col in before and before[col] != after[col]]
+    return {
+        "schemaChanged": previous["schemaHash"] != current["schemaHash"],
+        "rowCountChanged": previous["rowCount"] != current["rowCount"],
+        "added": [col for col in after if col not in before],
+        "removed": [col for col in before if col not in after],
+        "changed": changed,
+        "retyped": [col for col in changed if previous["dtypes"].get(col) != current["dtypes"].get(col)]
+    }
+
+def stale_questions(diff: Optional[Dict[str, Any]], answers: Dict[Tuple[int, int], Dict[str, Any]]) -> List[Tuple[int, int]]:
+    """
+    Stored questions to delete for a new dataset version, in task order: the first question built
+    from changed data and every answer after it. A diff of None means the versions couldn't be
+    compared, so every question built from the data is stale.
+    """
+    target = answers.get((2, 2), {}).get("userResponse")
+    features = answers.get((3, 0), {}).get("selectedOptions") or []
+    if diff is None:
+        affected = {"schema": True, "target": True, "features": True}
+    else:
+        touched = set(diff["changed"]) | set(diff["removed"])
+        affected = {
+            "schema": diff["schemaChanged"],
+            "target": target in touched,
+            "features": any(col in touched for col in features)
+        }
+
+    stale: List[Tuple[int, int]] = []
+    for key, dependencies in QUESTION_DEPENDENCIES.items():
+        if key not in answers:
+            continue
+        if any(affected[name] for name in dependencies["data"]) or any(dep in stale for dep in dependencies["answers"]):
+            stale.append(key)
+    if not stale:
+        return []
+    # Progress resumes after the last answered question, so every later answer goes too and
+    # the user is routed back to the first stale one
+    first = min(stale)
+    return sorted(key for key in answers if key >= first)
+
+class DatasetVersionService:
+    """Per-project history of uploaded datasets; a new version invalidates the questions from the first one it affects"""
+
+    def __init__(self):
+        self.datasets = dataset_service
+        self.s3 = dataset_service.s3
+        self.db = dynamodb_service
+
+    def versions_key(self, user_email: str, project_id: str) -> str:
+        return f"projects/{user_email}/{project_id}/dataset_versions.json"
+
+    def list_versions(self, user_email: str, project_id: str) -> List[Dict[str, Any]]:
+        try:
+            response = self.s3.s3_client.get_object(
+                Bucket=self.s3.bucket_name, Key=self.versions_key(user_email, project_id)
+            )
+            return json.loads(response['Body'].read())["versions"]
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('404', 'NoSuchKey', 'NotFound'):
+                raise
+            return []
+
+    def _version_entry(self, file_key: str, with_hashes: bool) -> Optional[Dict[str, Any]]:
+        """
+        Version record of an upload; column hashes are left out of first versions until a diff
+        needs them. Types are the profile's logical ones, so storage dtypes never count as a change.
+        """
+        profile = self.datasets.get_profile(file_key)
+        if not profile:
+            return None
+        dtypes = {col["name"]: col["type"] for col in profile["columns"]}
+        entry = {
+            "fileKey": file_key,
+            "contentHash": profile.get("contentHash"),
+            "schemaHash": schema_hash(dtypes),
+            "dtypes": dtypes,
+            "rowCount": profile["rowCount"],
+            "profileVersion": PROFILE_VERSION
+        }
+        hashes = self.datasets.column_hashes(file_key) if with_hashes else profile.get("columnHashes")
+        if hashes is not None:
+            entry["columnHashes"] = hashes
+        return entry
+
+    def record_upload(self, user_email: str, project_id: str, file_key: str,
+                      previous_file_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Add a dataset version for a newly submitted upload, diff it against the previous one by
+        schema and column hashes and delete the stored questions that depend on what changed.
+        """
+        try:
+            versions = self.list_versions(user_email, project_id)
+            if versions and versions[-1]["fileKey"] == file_key:
+                return {"success": True, "message": "Dataset version already recorded", "version": versions[-1]}
+
+            replaces = bool(versions) or bool(previous_file_key and previous_file_key != file_key)
+            entry = self._version_entry(file_key, with_hashes=replaces)
+            if entry is None:
+                return {"success": False, "message": "Failed to load dataset profile"}
+
+            previous = versions[-1] if versions else None
+            if previous is None and replaces:
+                # Projects whose earlier uploads predate versioning
+                previous = self._version_entry(previous_file_key, with_hashes=True)
+                if previous is not None:
+                    previous["version"] = 0
+            elif previous is not None and previous.get("profileVersion") != PROFILE_VERSION:
+                # Recorded with older types and hashes; recompute them to compare like with like
+                refreshed = self._version_entry(previous["fileKey"], with_hashes=True)
+                if refreshed is not None:
+                    previous = {**previous, **refreshed}
+                else:
+                    previous = {key: value for key, value in previous.items() if key != "columnHashes"}
+            elif previous is not None and "columnHashes" not in previous:
+                hashes = self.datasets.column_hashes(previous["fileKey"])
+                if hashes is not None:
+                    previous["columnHashes"] = hashes
+
+            comparable = previous is not None and "columnHashes" in previous
+            diff = diff_versions(previous, entry) if comparable else None
+            invalidated: List[Tuple[int, int]] = []
+            if previous is not None or previous_file_key:
+                answers_result = self.db.get_project_answers(user_email, project_id)
+                if not answers_result["success"]:
+                    return answers_result
+                answers = {
+                    (int(item["taskIndex"]), int(item["subtaskIndex"])): item
+                    for item in answers_result["answers"]
+                }
+                invalidated = stale_questions(diff, answers)
+                if invalidated:
+                    deleted = self.db.delete_answers(user_email, project_id, invalidated)
+                    if not deleted["success"]:
+                        return deleted
+
+            entry.update({
+                "version": (previous["version"] + 1) if previous is not None else 1,
+                "diff": diff,
+                "invalidatedQuestions": [f"{task}.{subtask}" for task, subtask in invalidated],
+                "createdAt": datetime.utcnow().isoformat()
+            })
+            versions = (versions + [entry])[-MAX_VERSIONS:]
+            self.s3.s3_client.put_object(
+                Bucket=self.s3.bucket_name,
+                Key=self.versions_key(user_email, project_id),
+                Body=json.dumps({"versions": versions}).encode('utf-8'),
+                ContentType='application/json'
+            )
+            logger.info(
+                f"Recorded dataset version {entry['version']} for project {project_id}, "
+                f"invalidated questions: {entry['invalidatedQuestions']}"
+            )
+            return {"success": True, "message": "Dataset version recorded", "version": entry}
+
+        except ClientError as e:
+            logger.error(f"Error recording dataset version for project {project_id}: {e}")
+            return {"success": False, "message": f"Failed to record dataset version: {str(e)}"}
+
+# Global instance
+dataset_version_service = DatasetVersionService()
@@ -1,22 +1,19 @@
-import boto3
 from boto3.dynamodb.conditions import Key, Attr
 from botocore.exceptions import ClientError
 from config import settings
-from typing import Dict, List, Optional, Any
+from services.aws import aws_client_factory
+from services.metrics import metrics_service
+from typing import Dict, List, Optional, Any, Tuple
 import logging
 import json
+import time
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
 class DynamoDBService:
     def __init__(self):
-        self.dynamodb = boto3.resource(
-            'dynamodb',
-            aws_access_key_id=settings.aws_access_key_id,
-            aws_secret_access_key=settings.aws_secret_access_key,
-            region_name=settings.aws_region
-        )
+        self.dynamodb = aws_client_factory.resource('dynamodb')
         self.table_name = settings.dynamodb_table_name
         self.table = None
         self._initialize_table()
@@ -74,6 +71,20 @@ class DynamoDBService:
             logger.error(f"Error creating DynamoDB table: {e}")
             raise
 
+    def _call(self, operation: str, **kwargs) -> Dict:
+        """Run a table operation, recording latency and consumed capacity for the calling endpoint"""
+        kwargs.setdefault('ReturnConsumedCapacity', 'TOTAL')
+        started = time.perf_counter()
+        try:
+            response = getattr(self.table, operation)(**kwargs)
+        except ClientError:
+            metrics_service.record_dynamodb_call(operation, (time.perf_counter() - started) * 1000, error=True)
+            raise
+        metrics_service.record_dynamodb_call(
+            operation, (time.perf_counter() - started) * 1000, response.get('ConsumedCapacity')
+        )
+        return response
+
     # ========== PROJECT OPERATIONS ==========
     
     def create_project(self, user_email: str, project_id: str, project_name: str, project_type: str) -> Dict:
@@ -92,7 +103,7 @@ class DynamoDBService:
                 'itemType': 'PROJECT'
             }
             
-            self.table.put_item(
+            self._call('put_item',
                 Item=item,
                 ConditionExpression='attribute_not_exists(PK)'
             )
@@ -119,7 +130,7 @@ class DynamoDBService:
         """Get all projects for a user"""
         try:
             # Use scan with filter expression to find all user projects
-            response = self.table.scan(
+            response = self._call('scan',
                 FilterExpression=Attr('userEmail').eq(user_email) & Attr('itemType').eq('PROJECT')
             )
             
@@ -142,7 +153,7 @@ class DynamoDBService:
     def get_project(self, user_email: str, project_id: str) -> Dict:
         """Get a specific project"""
         try:
-            response = self.table.get_item(
+            response = self._call('get_item',
                 Key={
                     'PK': f"{user_email}#{project_id}",
                     'SK': 'PROJECT'
@@ -170,7 +181,7 @@ class DynamoDBService:
     def update_project_context(self, user_email: str, project_id: str, new_context: str) -> Dict:
         """Update the LLM context for a project"""
         try:
-            response = self.table.update_item(
+            response = self._call('update_item',
                 Key={
                     'PK': f"{user_email}#{project_id}",
                     'SK': 'PROJECT'
@@ -202,7 +213,7 @@ class DynamoDBService:
             self._delete_project_qa_data(user_email, project_id)
             
             # Then delete the project itself
-            self.table.delete_item(
+            self._call('delete_item',
                 Key={
                     'PK': f"{user_email}#{project_id}",
                     'SK': 'PROJECT'
@@ -265,7 +276,7 @@ class DynamoDBService:
             # Debug logging
             logger.info(f"Saving item to DynamoDB: {item}")
             
-            self.table.put_item(Item=item)
+            self._call('put_item', Item=item)
             
             logger.info(f"Q&A saved for project {project_id}, task {task_index}, subtask {subtask_index}")
             return {
@@ -283,7 +294,7 @@ class DynamoDBService:
     def get_project_answers(self, user_email: str, project_id: str) -> Dict:
         """Get all answers for a project"""
         try:
-            response = self.table.query(
+            response = self._call('query',
                 KeyConditionExpression=Key('PK').eq(f"{user_email}#{project_id}") & Key('SK').begins_with('TASK#'),
                 ScanIndexForward=True
             )
@@ -310,7 +321,7 @@ class DynamoDBService:
     def get_specific_answer(self, user_email: str, project_id: str, task_index: int, subtask_index: int) -> Dict:
         """Get a specific answer"""
         try:
-            response = self.table.get_item(
+            response = self._call('get_item',
                 Key={
                     'PK': f"{user_email}#{project_id}",
                     'SK': f"TASK#{task_index}#SUBTASK#{subtask_index}"
@@ -335,15 +346,44 @@ class DynamoDBService:
                 "message": f"Failed to retrieve answer: {str(e)}"
             }
 
+    def delete_answers(self, user_email: str, project_id: str, keys: List[Tuple[int, int]]) -> Dict:
+        """Delete the stored questions and answers of the given (task, subtask) pairs"""
+        try:
+            # batch_writer doesn't report capacity, so only latency is recorded
+            started = time.perf_counter()
+            with self.table.batch_writer() as batch:
+                for task_index, subtask_index in keys:
+                    batch.delete_item(
+                        Key={
+                            'PK': f"{user_email}#{project_id}",
+                            'SK': f"TASK#{task_index}#SUBTASK#{subtask_index}"
+                        }
+                    )
+            metrics_service.record_dynamodb_call('batch_write_item', (time.perf_counter() - started) * 1000)
+
+            logger.info(f"Deleted {len(keys)} answers for project {project_id}")
+            return {
+                "success": True,
+                "deleted": len(keys)
+            }
+
+        except ClientError as e:
+            logger.error(f"Error deleting answers for project {project_id}: {e}")
+            return {
+                "success": False,
+                "message": f"Failed to delete answers: {str(e)}"
+            }
+
     def _delete_project_qa_data(self, user_email: str, project_id: str):
         """Helper method to delete all Q&A data for a project"""
         try:
             # Query all Q&A items for this project
-            response = self.table.query(
+            response = self._call('query',
                 KeyConditionExpression=Key('PK').eq(f"{user_email}#{project_id}") & Key('SK').begins_with('TASK#')
             )
             
-            # Delete each item
+            # Delete each item (batch_writer doesn't report capacity, so only latency is recorded)
+            started = time.perf_counter()
             with self.table.batch_writer() as batch:
                 for item in response.get('Items', []):
                     batch.delete_item(
@@ -352,6 +392,7 @@ class DynamoDBService:
                             'SK': item['SK']
                         }
                     )
+            metrics_service.record_dynamodb_call('batch_write_item', (time.perf_counter() - started) * 1000)
             
             logger.info(f"Deleted Q&A data for project {project_id}")
             
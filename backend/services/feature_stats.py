@@ -0,0 +1,172 @@
+from typing import Any, Dict, List, Optional, Tuple
+import warnings
+import numpy as np
+import pandas as pd
+
+# Statistics on larger datasets use an evenly spread sample of this many rows
+MAX_STAT_ROWS = 200_000
+# Numeric columns are cut into quantile bins; categorical ones keep their most frequent values
+QUANTILE_BINS = 10
+MAX_CATEGORIES = 32
+# One extra code per column for missing values
+CODES = MAX_CATEGORIES + 1
+# Cells per joint-count pass, bounding the temporary code matrix
+MAX_PASS_CELLS = 8_000_000
+# Leakage suspects: near-perfect correlation or dependence on the target, or ID-like uniqueness
+LEAKAGE_CORRELATION = 0.98
+LEAKAGE_DEPENDENCE = 0.98
+ID_UNIQUE_RATIO = 0.95
+ID_MIN_ROWS = 20
+
+def _is_numeric(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)
+
+def _numeric_codes(X: np.ndarray) -> np.ndarray:
+    """Quantile-bin codes per column of a float matrix (NaN gets MAX_CATEGORIES)"""
+    codes = np.full(X.shape, MAX_CATEGORIES, dtype=np.int64)
+    if X.shape[0] == 0:
+        return codes
+    with warnings.catch_warnings():
+        # All-missing columns have NaN edges; they have no present values to bin anyway
+        warnings.simplefilter("ignore", RuntimeWarning)
+        edges = np.nanquantile(X, np.linspace(0, 1, QUANTILE_BINS + 1)[1:-1], axis=0)
+    for i in range(X.shape[1]):
+        present = ~np.isnan(X[:, i])
+        codes[present, i] = np.searchsorted(edges[:, i], X[present, i], side="right")
+    return codes
+
+def _category_codes(series: pd.Series) -> np.ndarray:
+    """Codes of the most frequent values; the rest share the last code and missing gets MAX_CATEGORIES"""
+    codes, _ = pd.factorize(series)
+    present = codes >= 0
+    counts = np.bincount(codes[present]) if present.any() else np.zeros(0, dtype=np.int64)
+    remap = np.full(len(counts), MAX_CATEGORIES - 1, dtype=np.int64)
+    keep = np.argsort(-counts, kind="stable")[:MAX_CATEGORIES - 1]
+    remap[keep] = np.arange(len(keep))
+    return np.where(present, remap[np.where(present, codes, 0)] if len(remap) else 0, MAX_CATEGORIES)
+
+def _joint_counts(F: np.ndarray, y: np.ndarray, classes: int) -> np.ndarray:
+    """Contingency tables of every feature code column against y, shape (features, CODES, classes)"""
+    rows, features = F.shape
+    tables = np.zeros((features, CODES, classes), dtype=np.int64)
+    step = max(1, MAX_PASS_CELLS // max(rows, 1))
+    for start in range(0, features, step):
+        block = F[:, start:start + step]
+        width = block.shape[1]
+        flat = (np.arange(width)[None, :] * CODES + block) * classes + y[:, None]
+        tables[start:start + width] = np.bincount(flat.ravel(), minlength=width * CODES * classes).reshape(width, CODES, classes)
+    return tables
+
+def _mutual_information(tables: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Mutual information (bits) of each table and the target entropy. The plug-in estimate grows with
+    the number of occupied cells even for independent columns, so each table's Miller-Madow bias
+    (cells - 1) * (classes - 1) / (2 N ln 2) is subtracted; many-valued noise no longer outranks signal.
+    """
+    total = tables.sum(axis=(1, 2), keepdims=True)
+    p = tables / np.maximum(total, 1)
+    px = p.sum(axis=2, keepdims=True)
+    py = p.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(p > 0, p * np.log2(p / (px * py)), 0.0)
+    py0 = py[0, 0] if len(py) else np.zeros(0)
+    entropy = float(-np.sum(np.where(py0 > 0, py0 * np.log2(np.where(py0 > 0, py0, 1)), 0.0)))
+    x_levels = (tables.sum(axis=2) > 0).sum(axis=1)
+    y_levels = (tables.sum(axis=1) > 0).sum(axis=1)
+    bias = (np.maximum(x_levels - 1, 0) * np.maximum(y_levels - 1, 0)) / (2 * np.maximum(total[:, 0, 0], 1) * np.log(2))
+    return np.maximum(terms.sum(axis=(1, 2)) - bias, 0.0), entropy
+
+def _correlations(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Pearson correlation of each column with y over the rows where the column is present"""
+    mask = ~np.isnan(X)
+    count = mask.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        X0 = np.where(mask, X, 0.0)
+        Xc = np.where(mask, X0 - X0.sum(axis=0) / count, 0.0)
+        Y = np.where(mask, y[:, None], 0.0)
+        yc = np.where(mask, Y - Y.sum(axis=0) / count, 0.0)
+        r = (Xc * yc).sum(axis=0) / np.sqrt((Xc * Xc).sum(axis=0) * (yc * yc).sum(axis=0))
+    return np.where(count > 2, r, np.nan)
+
+def feature_report(df: pd.DataFrame, target: str) -> List[Dict[str, Any]]:
+    """
+    Rank every other column as a predictor of the target. Mutual information uses binned numeric
+    values and the most frequent categories; correlation is Pearson for numeric columns against a
+    numeric or binary target. Leakage suspects are ranked last.
+    """
+    df = df[df[target].notna()]
+    features = [col for col in df.columns if col != target]
+    numeric = [col for col in features if _is_numeric(df[col])]
+    other = [col for col in features if col not in numeric]
+    rows = len(df)
+    if rows == 0 or not features:
+        return []
+
+    X = df[numeric].to_numpy(dtype=np.float64, na_value=np.nan) if numeric else np.empty((rows, 0))
+    F = np.empty((rows, len(features)), dtype=np.int64)
+    F[:, :len(numeric)] = _numeric_codes(X)
+    for i, col in enumerate(other):
+        F[:, len(numeric) + i] = _category_codes(df[col])
+    order = numeric + other
+
+    target_values = df[target]
+    y_numeric: Optional[np.ndarray] = None
+    if _is_numeric(target_values):
+        y_numeric = target_values.to_numpy(dtype=np.float64)
+        y = _numeric_codes(y_numeric[:, None])[:, 0]
+    else:
+        y = _category_codes(target_values)
+        if target_values.nunique() == 2:
+            # Binary targets correlate as a 0/1 indicator (point-biserial)
+            y_numeric = (y == y[0]).astype(np.float64)
+    y_codes, y = np.unique(y, return_inverse=True)
+
+    mi, entropy = _mutual_information(_joint_counts(F, y, len(y_codes)))
+    correlation = _correlations(X, y_numeric) if y_numeric is not None and numeric else np.full(len(numeric), np.nan)
+    missing = df[order].isna().to_numpy().mean(axis=0)
+    unique = df[order].nunique().to_numpy()
+    present = rows - df[order].isna().to_numpy().sum(axis=0)
+    # Only integer columns can be row ids; unique text (names, free text) is not flagged
+    integer_like = np.concatenate([
+        np.all(np.isnan(X) | (np.mod(X, 1) == 0), axis=0) if numeric else np.zeros(0, dtype=bool),
+        np.zeros(len(other), dtype=bool)
+    ])
+
+    report = []
+    for i, col in enumerate(order):
+        r = float(correlation[i]) if i < len(numeric) and not np.isnan(correlation[i]) else None
+        dependence = float(mi[i] / entropy) if entropy > 0 else 0.0
+        unique_ratio = float(unique[i] / present[i]) if present[i] else 0.0
+        leakage = []
+        if r is not None and abs(r) >= LEAKAGE_CORRELATION:
+            leakage.append("near-perfect correlation")
+        if dependence >= LEAKAGE_DEPENDENCE:
+            leakage.append("determines target")
+        if integer_like[i] and present[i] >= ID_MIN_ROWS and unique_ratio >= ID_UNIQUE_RATIO:
+            leakage.append("id-like")
+        report.append({
+            "column": col,
+            "kind": "numeric" if i < len(numeric) else "categorical",
+            "missingFraction": round(float(missing[i]), 4),
+            "uniqueRatio": round(unique_ratio, 4),
+            "correlation": round(r, 4) if r is not None else None,
+            "mutualInformation": round(float(mi[i]), 4),
+            "dependence": round(dependence, 4),
+            "leakage": leakage
+        })
+
+    report.sort(key=lambda item: (bool(item["leakage"]), -item["dependence"], -abs(item["correlation"] or 0)))
+    for rank, item in enumerate(report, start=1):
+        item["rank"] = rank
+    return report
+
+def ranked_table(report: List[Dict[str, Any]]) -> str:
+    """Compact pipe-separated table of the report for LLM prompts"""
+    lines = ["rank|column|kind|missing%|corr|dependence|leakage"]
+    for item in report:
+        corr = "" if item["correlation"] is None else f"{item['correlation']:.2f}"
+        lines.append(
+            f"{item['rank']}|{item['column']}|{item['kind']}|{item['missingFraction'] * 100:.0f}"
+            f"|{corr}|{item['dependence']:.3f}|{','.join(item['leakage'])}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,36 @@
+from typing import Optional
+
+# Accepted dataset upload suffixes, their format and the Content-Type they are stored with
+FORMAT_BY_SUFFIX = {
+    ".csv": "csv",
+    ".csv.gz": "csv",
+    ".csv.zst": "csv",
+    ".parquet": "parquet",
+    ".feather": "feather",
+}
+CONTENT_TYPES = {
+    ".csv": "text/csv",
+    ".csv.gz": "application/gzip",
+    ".csv.zst": "application/zstd",
+    ".parquet": "application/vnd.apache.parquet",
+    ".feather": "application/vnd.apache.arrow.file",
+}
+DATASET_SUFFIXES = tuple(FORMAT_BY_SUFFIX)
+
+def _suffix(file_name: str) -> Optional[str]:
+    name = file_name.lower()
+    # Longest first so ".csv.gz" isn't taken for something else
+    for suffix in sorted(FORMAT_BY_SUFFIX, key=len, reverse=True):
+        if name.endswith(suffix):
+            return suffix
+    return None
+
+def is_dataset_upload(file_name: str) -> bool:
+    return _suffix(file_name) is not None
+
+def format_for(file_name: str) -> str:
+    """csv, parquet or feather; names without a known suffix are treated as CSV"""
+    return FORMAT_BY_SUFFIX.get(_suffix(file_name), "csv")
+
+def content_type_for(file_name: str) -> str:
+    return CONTENT_TYPES.get(_suffix(file_name), "text/csv")
@@ -0,0 +1,108 @@
+from contextvars import ContextVar
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Route template of the request currently being served (set by middleware in main.py)
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="background")
+
+READ_OPERATIONS = {"get_item", "query", "scan", "batch_get_item"}
+
+class OperationStats:
+    """Running aggregates for one (endpoint, operation) pair"""
+
+    def __init__(self, sample_size: int = 1000):
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.read_units = 0.0
+        self.write_units = 0.0
+        # Recent latencies for percentile estimates; bounded so memory stays flat
+        self.samples: Deque[float] = deque(maxlen=sample_size)
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2) if ordered else 0.0
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avgMs": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50Ms": pick(0.50),
+            "p99Ms": pick(0.99),
+            "maxMs": round(self.max_ms, 2),
+            "readCapacityUnits": round(self.read_units, 2),
+            "writeCapacityUnits": round(self.write_units, 2)
+        }
+
+class MetricsService:
+    """In-process registry for per-endpoint DynamoDB latency and capacity"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dynamodb: Dict[Tuple[str, str], OperationStats] = {}
+
+    def record_dynamodb_call(self, operation: str, latency_ms: float,
+                             consumed_capacity: Optional[Any] = None, error: bool = False):
+        """Record one DynamoDB call against the endpoint currently being served"""
+        units = 0.0
+        # Batch operations return a list of per-table capacities
+        capacities = consumed_capacity if isinstance(consumed_capacity, list) else [consumed_capacity]
+        for capacity in capacities:
+            if capacity:
+                units += float(capacity.get("CapacityUnits", 0.0))
+
+        key = (current_endpoint.get(), operation)
+        with self._lock:
+            stats = self._dynamodb.get(key)
+            if stats is None:
+                stats = self._dynamodb[key] = OperationStats()
+            stats.count += 1
+            stats.errors += int(error)
+            stats.total_ms += latency_ms
+            stats.max_ms = max(stats.max_ms, latency_ms)
+            stats.samples.append(latency_ms)
+            if operation in READ_OPERATIONS:
+                stats.read_units += units
+            else:
+                stats.write_units += units
+
+    def dynamodb_summary(self) -> Dict[str, Any]:
+        """Aggregates per endpoint, most expensive endpoints first"""
+        with self._lock:
+            rows: List[Dict[str, Any]] = [
+                {"endpoint": endpoint, "operation": operation, **stats.to_dict()}
+                for (endpoint, operation), stats in self._dynamodb.items()
+            ]
+
+        endpoints: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            totals = endpoints.setdefault(row["endpoint"], {
+                "endpoint": row["endpoint"],
+                "calls": 0,
+                "readCapacityUnits": 0.0,
+                "writeCapacityUnits": 0.0,
+                "operations": []
+            })
+            totals["calls"] += row["count"]
+            totals["readCapacityUnits"] = round(totals["readCapacityUnits"] + row["readCapacityUnits"], 2)
+            totals["writeCapacityUnits"] = round(totals["writeCapacityUnits"] + row["writeCapacityUnits"], 2)
+            totals["operations"].append({k: v for k, v in row.items() if k != "endpoint"})
+
+        return {
+            "endpoints": sorted(
+                endpoints.values(),
+                key=lambda e: e["readCapacityUnits"] + e["writeCapacityUnits"],
+                reverse=True
+            )
+        }
+
+    def reset(self):
+        with self._lock:
+            self._dynamodb.clear()
+
+# Global instance
+metrics_service = MetricsService()
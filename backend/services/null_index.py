@@ -0,0 +1,86 @@
+from typing import Dict, List, Optional
+import io
+import numpy as np
+import pandas as pd
+
+class NullIndex:
+    """
+    One packed bit-array per column with a set bit for every missing value. Columns without
+    nulls are not stored. Rows lost when a set of columns must be non-null is the popcount of
+    the OR of their bitmaps.
+    """
+
+    def __init__(self, row_count: int, columns: List[str], bits: np.ndarray):
+        self.row_count = row_count
+        self.columns = columns
+        # uint8, shape (len(columns), ceil(row_count / 8)); padding bits are zero
+        self.bits = bits
+        self._positions = {col: i for i, col in enumerate(columns)}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "NullIndex":
+        mask = df.isna()
+        columns = [col for col, has_nulls in mask.any().items() if has_nulls]
+        bits = np.packbits(mask[columns].to_numpy(dtype=bool).T, axis=1) if columns else np.zeros((0, 0), dtype=np.uint8)
+        return cls(len(df), columns, bits)
+
+    def null_counts(self) -> Dict[str, int]:
+        """Missing values per column (columns without nulls are omitted)"""
+        counts = np.bitwise_count(self.bits).sum(axis=1, dtype=np.int64)
+        return {col: int(count) for col, count in zip(self.columns, counts)}
+
+    def rows_with_nulls(self, columns: List[str]) -> int:
+        """Rows where at least one of the columns is missing"""
+        rows = [self._positions[col] for col in columns if col in self._positions]
+        if not rows:
+            return 0
+        return int(np.bitwise_count(np.bitwise_or.reduce(self.bits[rows], axis=0)).sum(dtype=np.int64))
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            row_count=np.array(self.row_count, dtype=np.int64),
+            columns=np.array(self.columns, dtype=np.str_),
+            bits=self.bits
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "NullIndex":
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            return cls(int(arrays["row_count"]), arrays["columns"].tolist(), arrays["bits"])
+
+class NullIndexBuilder:
+    """Builds a NullIndex chunk by chunk; every chunk except the last must hold a multiple of 8 rows"""
+
+    def __init__(self):
+        self.row_count = 0
+        self.chunk_bytes: List[int] = []
+        # column -> {chunk number: packed bits}, only for chunks where the column has nulls
+        self.chunks: Dict[str, Dict[int, np.ndarray]] = {}
+        self.columns: Optional[List[str]] = None
+
+    def update(self, chunk: pd.DataFrame):
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+        if self.row_count % 8:
+            raise ValueError("Only the last chunk may have a row count that is not a multiple of 8")
+
+        number = len(self.chunk_bytes)
+        mask = chunk.isna()
+        for col, has_nulls in mask.any().items():
+            if has_nulls:
+                self.chunks.setdefault(col, {})[number] = np.packbits(mask[col].to_numpy(dtype=bool))
+        self.row_count += len(chunk)
+        self.chunk_bytes.append((len(chunk) + 7) // 8)
+
+    def build(self) -> NullIndex:
+        columns = [col for col in (self.columns or []) if col in self.chunks]
+        width = sum(self.chunk_bytes)
+        bits = np.zeros((len(columns), width), dtype=np.uint8)
+        starts = np.concatenate([[0], np.cumsum(self.chunk_bytes)]).astype(np.int64)
+        for row, col in enumerate(columns):
+            for number, packed in self.chunks[col].items():
+                bits[row, starts[number]:starts[number] + len(packed)] = packed
+        return NullIndex(self.row_count, columns, bits)
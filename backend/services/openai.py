@@ -4,6 +4,7 @@ import time
 import logging
 from typing import Dict, List, Any, Optional, Tuple
 from config import settings
+from services.sampling import prompt_table
 from models import (
     QuestionType, AIQuestionGenerationResponse, AITargetColumnResponse, 
     AIProblemTypeResponse, AIFeatureSelectionResponse,
@@ -162,7 +163,7 @@ Be confident in your assessment and educational in your explanation.
     def validate_csv_content(self, csv_data: List[Dict[str, Any]], context: str) -> Tuple[bool, str]:
         """Validate CSV content using OpenAI"""
         try:
-            sample_data = json.dumps(csv_data[:5], indent=2) if csv_data else "No data"
+            sample_data = prompt_table(csv_data)
             
             messages = [
                 {
@@ -182,7 +183,7 @@ Analyze this CSV data sample and context:
 
 Context: {context}
 
-Sample data (first 5 rows):
+Representative sample rows (every class of low-cardinality columns and rows with missing values included):
 {sample_data}
 
 Determine if this data is:
@@ -254,12 +255,22 @@ Analyze the following dataset for the user's project.\n\nThe full dataset summar
                 error=f"Failed to analyze columns: {str(e)}"
             )
 
-    def generate_feature_columns(self, csv_data: List[Dict[str, Any]], target_column: str, context: str) -> AIFeatureSelectionResponse:
-        """Generate suitable feature columns for prediction using GPT-4o"""
+    def generate_feature_columns(self, csv_data: List[Dict[str, Any]], target_column: str, context: str,
+                                 feature_table: Optional[str] = None) -> AIFeatureSelectionResponse:
+        """
+        Generate suitable feature columns for prediction using GPT-4o. When a ranked feature
+        statistics table is given it is sent instead of the sample rows.
+        """
         try:
             columns = list(csv_data[0].keys()) if csv_data else []
             # Remove target column from available features
             available_features = [col for col in columns if col != target_column]
+            if feature_table:
+                data_section = f"""Feature statistics, ranked by dependence of the target on each column (0-1), with Pearson correlation and leakage flags:
+    {feature_table}"""
+            else:
+                data_section = f"""Representative sample rows:
+    {prompt_table(csv_data)}"""
             
             messages = [
                 {
@@ -287,8 +298,7 @@ Analyze the following dataset for the user's project.\n\nThe full dataset summar
     Target column to predict: {target_column}
     Available feature columns: {available_features}
 
-    Sample data (first 5 rows):
-    {json.dumps(csv_data[:5], indent=2)}
+    {data_section}
 
     Recommend which columns would be good features for predicting {target_column}. Consider:
     1. Relevance to the prediction task
@@ -368,11 +378,26 @@ Analyze the following dataset for the user's project.\n\nThe full dataset summar
                 error=f"Failed to analyze features: {str(e)}"
             )
 
-    def detect_problem_type(self, target_column: str, csv_data: List[Dict[str, Any]], context: str) -> AIProblemTypeResponse:
-        """Detect if the problem is regression or classification"""
+    def detect_problem_type(self, target_column: str, csv_data: List[Dict[str, Any]], context: str,
+                            target_stats: Optional[Dict[str, Any]] = None) -> AIProblemTypeResponse:
+        """
+        Detect if the problem is regression or classification. Cardinality comes from target_stats
+        (the whole dataset) when given; the sample rows are only there for context.
+        """
         try:
-            target_values = [row.get(target_column) for row in csv_data[:20] if target_column in row]
-            unique_values = list(set(target_values))[:10]
+            target_values = [row.get(target_column) for row in csv_data if target_column in row]
+            if target_stats is not None:
+                estimate = "approximately " if target_stats["approximate"] else ""
+                cardinality = f"""Column dtype: {target_stats['dtype']}
+Rows in dataset: {target_stats['rowCount']} ({target_stats['missingCount']} missing)
+Distinct values in dataset: {estimate}{target_stats['uniqueValues']}"""
+                if target_stats["topValues"]:
+                    cardinality += f"\nMost frequent values with counts: {target_stats['topValues']}"
+                cardinality += f"\nSample values (context only, not representative of cardinality): {target_values[:10]}"
+            else:
+                cardinality = f"""Sample values: {target_values[:10]}
+Unique values (sample): {list(set(target_values))[:10]}
+Total unique values in sample: {len(set(target_values))}"""
             
             messages = [
                 {
@@ -393,9 +418,7 @@ Analyze this target column for problem type:
 Context: {context}
 
 Target column: {target_column}
-Sample values: {target_values[:10]}
-Unique values (sample): {unique_values}
-Total unique values in sample: {len(set(target_values))}
+{cardinality}
 
 Determine if this is regression (continuous numerical prediction) or classification (category prediction).
 Consider the data type, number of unique values, and the nature of the values.
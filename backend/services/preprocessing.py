@@ -0,0 +1,392 @@
+from botocore.exceptions import ClientError
+from services.dataset import dataset_service, SIDECAR_ROW_GROUP_ROWS
+from services.dynamodb import dynamodb_service
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+import hashlib
+import warnings
+import io
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Bump when the engine's output changes so artifacts built by older code are not reused
+PREPROCESSING_VERSION = 2
+MISSING_STRATEGIES = ("none", "mean", "median", "drop")
+# Categorical features keep their most frequent values as one-hot columns; the rest share one
+MAX_ONE_HOT_CATEGORIES = 50
+OTHER_CATEGORY = "__other__"
+OVERSAMPLING_SEED = 0
+SPLIT_SEED = 0
+
+def choices_digest(choices: Dict[str, Any]) -> str:
+    """Stable key of a choice set"""
+    return hashlib.sha256(json.dumps(choices, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def _is_numeric(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)
+
+def _one_hot(values: pd.Series, categories: List[str]) -> np.ndarray:
+    """uint8 indicator matrix, one column per category; other values set the OTHER_CATEGORY column"""
+    codes = pd.Categorical(values.astype("string"), categories=categories).codes
+    if categories and categories[-1] == OTHER_CATEGORY:
+        # Missing values stay all-zero rows
+        codes = np.where((codes < 0) & values.notna().to_numpy(), len(categories) - 1, codes)
+    return (codes[:, None] == np.arange(len(categories))).astype(np.uint8)
+
+def preprocess(df: pd.DataFrame, choices: Dict[str, Any],
+               fit_rows: Optional[np.ndarray] = None) -> Tuple[pd.DataFrame, Dict[str, Any], Optional[np.ndarray]]:
+    """
+    Apply a Task 3 choice set to the feature and target columns of a dataset. Rows without a
+    target are always dropped. Numeric features become float64 (imputed, then standardized when
+    normalization was chosen), booleans 0/1 and every other feature is one-hot encoded.
+    Oversampled rows are appended after the original ones.
+
+    Parameters are fitted on all kept rows, or only on fit_rows (positions among the kept rows,
+    e.g. a training split) so held-out rows don't leak into the imputation and scaling values.
+    The row layout doesn't depend on fit_rows.
+
+    Returns the preprocessed frame, the fitted parameters (imputation values, scaling, encodings)
+    and, when rows were oversampled, the position of each appended row's source row.
+    """
+    target = choices["target"]
+    features = choices["features"]
+    df = df[df[target].notna()]
+    if choices["missing"] == "drop":
+        df = df[df[features].notna().all(axis=1)]
+    rows = len(df)
+    fit = np.arange(rows) if fit_rows is None else np.asarray(fit_rows)
+
+    numeric = [col for col in features if _is_numeric(df[col])]
+    flags = [col for col in features if pd.api.types.is_bool_dtype(df[col].dtype)]
+    categorical = [col for col in features if col not in numeric and col not in flags]
+    params: Dict[str, Any] = {"imputation": {}, "scaling": {}, "encodings": {}}
+    blocks: Dict[str, np.ndarray] = {}
+
+    # Numeric features as one float matrix so imputation and scaling are column-wise array ops
+    X = df[numeric].to_numpy(dtype=np.float64, na_value=np.nan) if numeric else np.empty((rows, 0))
+    if numeric and choices["missing"] in ("mean", "median"):
+        # All-missing columns warn and produce NaN; they are filled with 0
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            fill = np.nanmean(X[fit], axis=0) if choices["missing"] == "mean" else np.nanmedian(X[fit], axis=0)
+        fill = np.where(np.isnan(fill), 0.0, fill)
+        X = np.where(np.isnan(X), fill, X)
+        params["imputation"].update({col: float(value) for col, value in zip(numeric, fill)})
+    if numeric and choices["normalize"]:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            mean = np.nanmean(X[fit], axis=0)
+            std = np.nanstd(X[fit], axis=0)
+        std = np.where((std == 0) | np.isnan(std), 1.0, std)
+        mean = np.where(np.isnan(mean), 0.0, mean)
+        X = (X - mean) / std
+        params["scaling"] = {col: {"mean": float(m), "std": float(s)} for col, m, s in zip(numeric, mean, std)}
+    for i, col in enumerate(numeric):
+        blocks[col] = X[:, i]
+
+    for col in flags:
+        values = df[col]
+        mode = values.iloc[fit].mode()
+        if choices["missing"] in ("mean", "median") and values.isna().any() and len(mode):
+            values = values.fillna(mode.iloc[0])
+            params["imputation"][col] = bool(mode.iloc[0])
+        blocks[col] = values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    for col in categorical:
+        values = df[col]
+        if choices["missing"] in ("mean", "median") and values.isna().any():
+            mode = values.iloc[fit].mode()
+            if len(mode):
+                values = values.fillna(mode.iloc[0])
+                params["imputation"][col] = str(mode.iloc[0])
+        counts = values.iloc[fit].astype("string").value_counts()
+        categories = [str(value) for value in counts.index[:MAX_ONE_HOT_CATEGORIES]]
+        if len(counts) > MAX_ONE_HOT_CATEGORIES:
+            categories = categories[:MAX_ONE_HOT_CATEGORIES - 1] + [OTHER_CATEGORY]
+        params["encodings"][col] = categories
+        indicators = _one_hot(values, categories)
+        for j, category in enumerate(categories):
+            blocks[f"{col}={category}"] = indicators[:, j]
+
+    result = pd.DataFrame(blocks, index=pd.RangeIndex(rows))
+    result[target] = df[target].reset_index(drop=True)
+
+    resampled_from = None
+    if choices["oversample"] and rows:
+        # Random oversampling: draw extra rows of every class until it matches the largest one
+        codes, _ = pd.factorize(result[target])
+        counts = np.bincount(codes)
+        rng = np.random.default_rng(OVERSAMPLING_SEED)
+        extra = [
+            rng.choice(np.flatnonzero(codes == label), counts.max() - count, replace=True)
+            for label, count in enumerate(counts) if count < counts.max()
+        ]
+        if extra:
+            resampled_from = np.concatenate(extra).astype(np.int32)
+            result = pd.concat([result, result.iloc[resampled_from]], ignore_index=True)
+    return result, params, resampled_from
+
+def split_indices(original_rows: int, train_percentage: int, target: Optional[np.ndarray] = None,
+                  resampled_from: Optional[np.ndarray] = None, seed: int = SPLIT_SEED) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Seeded train/test row positions into a preprocessed artifact as sorted int32 arrays. Only the
+    original rows are split, per class when their target labels are given. Oversampled copies
+    follow their source row: they join train and never mirror a test row.
+    """
+    order = np.random.default_rng(seed).permutation(original_rows)
+    test_fraction = (100 - train_percentage) / 100
+    is_test = np.zeros(original_rows, dtype=bool)
+    if target is None:
+        is_test[order[:int(round(original_rows * test_fraction))]] = True
+    else:
+        # Group the shuffled rows by class; the first quota rows of each class go to test
+        codes, _ = pd.factorize(target)
+        grouped = order[np.argsort(codes[order], kind="stable")]
+        counts = np.bincount(codes, minlength=codes.max() + 1 if len(codes) else 0)
+        quota = np.round(counts * test_fraction).astype(np.int64)
+        if 0 < test_fraction < 1:
+            # Classes with two or more rows appear on both sides
+            quota = np.where(counts >= 2, np.clip(quota, 1, counts - 1), 0)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+        grouped_codes = codes[grouped]
+        rank = np.arange(original_rows) - starts[grouped_codes]
+        is_test[grouped[rank < quota[grouped_codes]]] = True
+
+    train = np.flatnonzero(~is_test)
+    if resampled_from is not None:
+        train = np.concatenate([train, original_rows + np.flatnonzero(~is_test[resampled_from])])
+    return train.astype(np.int32), np.flatnonzero(is_test).astype(np.int32)
+
+class PreprocessingService:
+    """Materializes the Task 3 choices as a Parquet artifact stored once per dataset and choice set"""
+
+    def __init__(self):
+        self.datasets = dataset_service
+        self.s3 = dataset_service.s3
+        self.db = dynamodb_service
+
+    def get_choices(self, user_email: str, project_id: str) -> Optional[Dict[str, Any]]:
+        """The project's Task 2/3 answers as a choice set, or None until the feature selection is answered"""
+        target_answer = self.db.get_specific_answer(user_email, project_id, 2, 2)
+        features_answer = self.db.get_specific_answer(user_email, project_id, 3, 0)
+        if not target_answer["success"] or not features_answer["success"]:
+            return None
+
+        def response(subtask_index: int) -> str:
+            answer = self.db.get_specific_answer(user_email, project_id, 3, subtask_index)
+            return answer["answer"].get("userResponse", "") if answer["success"] else ""
+
+        # Options are matched on the wording of the Task 3 questions
+        missing_response = response(1)
+        if missing_response.startswith("Fill with mean"):
+            missing = "mean"
+        elif missing_response.startswith("Fill with median"):
+            missing = "median"
+        elif missing_response.startswith("Drop rows"):
+            missing = "drop"
+        else:
+            missing = "none"
+
+        target = target_answer["answer"].get("userResponse", "")
+        return {
+            "target": target,
+            "features": [col for col in features_answer["answer"].get("selectedOptions", []) if col != target],
+            "missing": missing,
+            "normalize": response(2).startswith("Normalize"),
+            "oversample": response(3).startswith("Yes")
+        }
+
+    def artifact_prefix(self, file_key: str, choices: Dict[str, Any]) -> str:
+        """S3 prefix of the artifact; shared by uploads of the same bytes once fingerprinted"""
+        content_hash = self.datasets.content_hash(file_key)
+        base = self.datasets.content_key(content_hash, "") if content_hash else f"{file_key}."
+        return f"{base}preprocessed/v{PREPROCESSING_VERSION}/{choices_digest(choices)}/"
+
+    def _read_json(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.s3.s3_client.get_object(Bucket=self.s3.bucket_name, Key=key)
+            return json.loads(response['Body'].read())
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('404', 'NoSuchKey', 'NotFound'):
+                logger.error(f"Error reading preprocessing artifact {key}: {e}")
+            return None
+
+    def _read_manifest(self, prefix: str) -> Optional[Dict[str, Any]]:
+        manifest = self._read_json(f"{prefix}manifest.json")
+        if manifest is not None:
+            # Manifests are shared across projects; ones written by older code named the upload they were built from
+            manifest.pop("sourceFileKey", None)
+        return manifest
+
+    def _write(self, key: str, body: bytes, content_type: str):
+        self.s3.s3_client.put_object(Bucket=self.s3.bucket_name, Key=key, Body=body, ContentType=content_type)
+
+    def _write_frame(self, key: str, df: pd.DataFrame):
+        buffer = io.BytesIO()
+        pq.write_table(
+            pa.Table.from_pandas(df, preserve_index=False),
+            buffer,
+            compression='zstd',
+            row_group_size=SIDECAR_ROW_GROUP_ROWS
+        )
+        self._write(key, buffer.getvalue(), 'application/vnd.apache.parquet')
+
+    def materialize(self, file_key: str, choices: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return the manifest of the preprocessed dataset for a choice set, building and storing
+        it on first use. The manifest is written last, so its presence marks a complete artifact.
+        """
+        # Features in dataset column order so the same selection always maps to the same artifact
+        columns = list(self.datasets.get_profile(file_key)["dtypes"])
+        unknown = [col for col in choices["features"] + [choices["target"]] if col not in columns]
+        if unknown:
+            raise ValueError(f"Columns not in the dataset: {', '.join(unknown)}")
+        choices = {**choices, "features": [col for col in columns if col in choices["features"]]}
+
+        prefix = self.artifact_prefix(file_key, choices)
+        manifest = self._read_manifest(prefix)
+        if manifest is not None:
+            return manifest
+
+        if choices["missing"] not in MISSING_STRATEGIES:
+            raise ValueError(f"Unknown missing-value strategy '{choices['missing']}'")
+        df = self.datasets.load_columns(file_key, choices["features"] + [choices["target"]])
+        result, params, resampled_from = preprocess(df, choices)
+
+        self._write_frame(f"{prefix}data.parquet", result)
+        if resampled_from is not None:
+            buffer = io.BytesIO()
+            np.save(buffer, resampled_from, allow_pickle=False)
+            self._write(f"{prefix}resampled_from.npy", buffer.getvalue(), 'application/octet-stream')
+
+        oversampled = 0 if resampled_from is None else len(resampled_from)
+        manifest = {
+            "version": PREPROCESSING_VERSION,
+            "choices": choices,
+            "dataKey": f"{prefix}data.parquet",
+            "resampledFromKey": f"{prefix}resampled_from.npy" if oversampled else None,
+            "rowCount": len(result),
+            "originalRowCount": len(result) - oversampled,
+            "droppedRows": len(df) - (len(result) - oversampled),
+            "oversampledRows": oversampled,
+            "featureColumns": [col for col in result.columns if col != choices["target"]],
+            "targetColumn": choices["target"],
+            "parameters": params,
+            "createdAt": datetime.utcnow().isoformat()
+        }
+        self._write(f"{prefix}manifest.json", json.dumps(manifest).encode('utf-8'), 'application/json')
+        logger.info(f"Stored preprocessed dataset {prefix} ({len(result)} rows, {len(manifest['featureColumns'])} features)")
+        return manifest
+
+    def prepare_project(self, user_email: str, project_id: str) -> Dict[str, Any]:
+        """Preprocess the project's dataset with its current Task 3 answers"""
+        try:
+            csv_answer = self.db.get_specific_answer(user_email, project_id, 2, 0)
+            file_key = csv_answer["answer"].get("fileUrl") if csv_answer["success"] else None
+            if not file_key:
+                return {"success": False, "message": "No dataset uploaded for this project"}
+
+            choices = self.get_choices(user_email, project_id)
+            if choices is None:
+                return {"success": False, "message": "Target column and feature selection are required"}
+
+            manifest = self.materialize(file_key, choices)
+            return {"success": True, "message": "Preprocessed dataset ready", "manifest": manifest, "fileKey": file_key}
+
+        except Exception as e:
+            logger.error(f"Error preprocessing dataset for project {project_id}: {e}")
+            return {"success": False, "message": f"Failed to preprocess dataset: {str(e)}"}
+
+    def split_key(self, manifest: Dict[str, Any], train_percentage: int, stratified: bool, suffix: str = "npz") -> str:
+        """S3 key of a split artifact, stored next to the preprocessed data it indexes"""
+        prefix = manifest["dataKey"].rsplit("/", 1)[0]
+        kind = "stratified" if stratified else "random"
+        return f"{prefix}/split_{train_percentage}_{kind}_{SPLIT_SEED}.{suffix}"
+
+    def _load_array(self, key: str) -> np.ndarray:
+        response = self.s3.s3_client.get_object(Bucket=self.s3.bucket_name, Key=key)
+        return np.load(io.BytesIO(response['Body'].read()), allow_pickle=False)
+
+    def load_split(self, split_key: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Train and test row positions into the preprocessed data"""
+        with self._load_array(split_key) as arrays:
+            return arrays["train"], arrays["test"]
+
+    def materialize_split(self, file_key: str, manifest: Dict[str, Any], train_percentage: int,
+                          stratified: bool) -> Dict[str, Any]:
+        """
+        Summary of the split for a train percentage, computing and storing it on first use. Next to
+        the indices the split stores its own copy of the preprocessed data, with the imputation,
+        scaling and encodings fitted on the training rows only. The summary is written last.
+        """
+        summary_key = self.split_key(manifest, train_percentage, stratified, "json")
+        summary = self._read_json(summary_key)
+        if summary is not None:
+            return summary
+
+        original_rows = manifest["originalRowCount"]
+        target = None
+        if stratified:
+            # Only the target column of the original rows is read
+            table = pq.read_table(self.s3.open_object(manifest["dataKey"]), columns=[manifest["targetColumn"]])
+            target = table.column(0).slice(0, original_rows).to_numpy(zero_copy_only=False)
+        resampled_from = self._load_array(manifest["resampledFromKey"]) if manifest["resampledFromKey"] else None
+        train, test = split_indices(original_rows, train_percentage, target, resampled_from)
+
+        choices = manifest["choices"]
+        df = self.datasets.load_columns(file_key, choices["features"] + [choices["target"]])
+        result, params, _ = preprocess(df, choices, fit_rows=train[train < original_rows])
+        data_key = self.split_key(manifest, train_percentage, stratified, "parquet")
+        self._write_frame(data_key, result)
+
+        key = self.split_key(manifest, train_percentage, stratified)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, train=train, test=test)
+        self._write(key, buffer.getvalue(), 'application/octet-stream')
+
+        summary = {
+            "splitKey": key,
+            "dataKey": data_key,
+            "trainPercentage": train_percentage,
+            "stratified": stratified,
+            "seed": SPLIT_SEED,
+            "trainRows": int(len(train)),
+            "testRows": int(len(test)),
+            "parameters": params
+        }
+        self._write(summary_key, json.dumps(summary).encode('utf-8'), 'application/json')
+        logger.info(f"Stored train/test split {key} ({len(train)} train, {len(test)} test rows)")
+        return summary
+
+    def prepare_split(self, user_email: str, project_id: str, train_percentage: Any) -> Dict[str, Any]:
+        """Materialize the train/test split for the project's preprocessed dataset"""
+        try:
+            # The stored slider answer is whatever the client sent (a Decimal once read back)
+            try:
+                train_percentage = int(train_percentage)
+            except (TypeError, ValueError):
+                return {"success": False, "message": f"Invalid train percentage: {train_percentage}"}
+            if not 0 < train_percentage < 100:
+                return {"success": False, "message": "Train percentage must be between 1 and 99"}
+            prepared = self.prepare_project(user_email, project_id)
+            if not prepared["success"]:
+                return prepared
+
+            # Same rule the Task 3 imbalance question uses
+            problem_answer = self.db.get_specific_answer(user_email, project_id, 2, 3)
+            stratified = problem_answer["success"] and "classification" in problem_answer["answer"].get("questionText", "").lower()
+            split = self.materialize_split(prepared["fileKey"], prepared["manifest"], train_percentage, stratified)
+            return {"success": True, "message": "Train/test split ready", "manifest": prepared["manifest"], "split": split}
+
+        except Exception as e:
+            logger.error(f"Error splitting dataset for project {project_id}: {e}")
+            return {"success": False, "message": f"Failed to split dataset: {str(e)}"}
+
+# Global instance
+preprocessing_service = PreprocessingService()
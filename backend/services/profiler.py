@@ -0,0 +1,324 @@
+from typing import Dict, Any, List, Optional
+import hashlib
+import json
+import numpy as np
+import pandas as pd
+from services.sketches import HyperLogLog, MisraGries, TDigest
+
+# Columns with at most this many distinct values get full value counts in the profile
+MAX_VALUE_COUNTS = 100
+SAMPLE_ROWS = 50
+
+def _mode_from_counts(counts: pd.Series) -> Optional[str]:
+    """Same result as Series.mode().iloc[0]: the smallest of the most frequent values"""
+    if counts.empty:
+        return None
+    top = counts[counts == counts.iloc[0]].index
+    try:
+        return str(min(top))
+    except TypeError:
+        # Mixed, unorderable values; fall back to the first most frequent one
+        return str(top[0])
+
+def logical_type(values: pd.Series) -> Optional[str]:
+    """
+    Storage-independent type of a column, named the way pandas' CSV reader types it: compact
+    dtypes (int8, category, float32) map back to int64/object/float64, and floats whose present
+    values are all whole numbers count as int64. None for numeric columns without values yet.
+    """
+    dtype = values.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "int64" if values.notna().any() else None
+    if pd.api.types.is_numeric_dtype(dtype):
+        data = values.to_numpy(dtype=np.float64, na_value=np.nan)
+        present = data[~np.isnan(data)]
+        if present.size == 0:
+            return None
+        return "int64" if np.all(np.mod(present, 1) == 0) else "float64"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime64[ns]"
+    return "object"
+
+def merge_logical_types(current: Optional[str], kind: Optional[str]) -> Optional[str]:
+    """Logical type of a whole column given the logical types of its chunks"""
+    if current is None or current == kind:
+        return kind
+    if kind is None:
+        return current
+    if {current, kind} == {"int64", "float64"}:
+        return "float64"
+    return "object"
+
+def _value_hashes(values: pd.Series) -> bytes:
+    """Row hashes of a column; numbers hash as floats so 1 and 1.0 from differently typed chunks match"""
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        values = values.astype(np.float64)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes()
+
+def _column_digest(hasher: "hashlib._Hash", kind: Optional[str]) -> str:
+    hasher.update((kind or "float64").encode('utf-8'))
+    return hasher.hexdigest()[:32]
+
+def column_hashes(df: pd.DataFrame) -> Dict[str, str]:
+    """
+    Content hash of every column (values in row order plus logical type), for diffing dataset
+    versions. The storage dtype is left out, so the same data hashes alike whether it was loaded
+    with compact dtypes or streamed in chunks. Hashing text is about as costly as profiling it,
+    so hashes are only computed on re-uploads.
+    """
+    hashes = {}
+    for col in df.columns:
+        hasher = hashlib.sha256(_value_hashes(df[col]))
+        hashes[col] = _column_digest(hasher, logical_type(df[col]))
+    return hashes
+
+def profile_dataframe(df: pd.DataFrame, max_value_counts: int = MAX_VALUE_COUNTS,
+                      previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Profile every column with whole-frame operations: one pass for nulls, one for numeric
+    distinct counts and means, and a single value_counts per non-numeric column that yields
+    its distinct count, mode and value counts together. Given the exact profile of an earlier
+    version of the dataset, columns whose content hash is unchanged keep their statistics and
+    only the changed columns are profiled.
+    """
+    row_count = len(df)
+    hashes = column_hashes(df) if previous is not None else None
+    reused = set()
+    if hashes is not None and previous.get("profileMode") == "exact" and previous.get("rowCount") == row_count:
+        previous_hashes = previous.get("columnHashes") or {}
+        reused = {col for col in df.columns if previous_hashes.get(col) == hashes[col]}
+    previous_columns = {info["name"]: info for info in previous["columns"]} if reused else {}
+    changed = [col for col in df.columns if col not in reused]
+
+    null_counts = df[changed].isna().sum()
+    numeric_columns = [col for col in changed if pd.api.types.is_numeric_dtype(df[col].dtype)]
+    numeric_df = df[numeric_columns]
+    unique_counts = numeric_df.nunique()
+    means = numeric_df.mean()
+    numeric = set(numeric_columns)
+
+    columns = []
+    value_counts = {}
+    nulls = {}
+    for col in df.columns:
+        if col in reused:
+            columns.append(previous_columns[col])
+            nulls[col] = previous["nullCounts"][col]
+            if col in previous["valueCounts"]:
+                value_counts[col] = previous["valueCounts"][col]
+            continue
+
+        dtype = df[col].dtype
+        null_count = int(null_counts[col])
+        nulls[col] = null_count
+        if col in numeric:
+            unique_values = int(unique_counts[col])
+            counts = df[col].value_counts() if unique_values <= max_value_counts else None
+        else:
+            counts = df[col].value_counts()
+            unique_values = len(counts)
+        col_info = {
+            "name": col,
+            "type": logical_type(df[col]) or "float64",
+            "unique_values": unique_values,
+            "missing_count": null_count
+        }
+
+        if col in numeric:
+            if unique_values < 10 and pd.api.types.is_integer_dtype(dtype):
+                col_info["semantic_type"] = "categorical_numeric"
+            else:
+                col_info["semantic_type"] = "numeric"
+            col_info["mean"] = float(means[col]) if null_count < row_count else None
+        else:
+            if pd.api.types.is_datetime64_any_dtype(dtype):
+                col_info["semantic_type"] = "datetime"
+            elif unique_values < row_count * 0.5:  # Less than 50% unique values
+                col_info["semantic_type"] = "categorical"
+            else:
+                col_info["semantic_type"] = "text"
+            col_info["mode"] = _mode_from_counts(counts)
+
+        if unique_values <= max_value_counts:
+            value_counts[col] = {str(k): int(v) for k, v in counts.items()}
+
+        columns.append(col_info)
+
+    profile = {
+        "rowCount": row_count,
+        "columnCount": len(df.columns),
+        "columns": columns,
+        # Compact storage dtypes, kept internal for re-parsing; columns report the logical type
+        "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        "nullCounts": nulls,
+        "valueCounts": value_counts,
+        # JSON round-trip turns NaN into null so the profile is valid JSON
+        "sampleRows": json.loads(df.head(SAMPLE_ROWS).to_json(orient='records', date_format='iso')),
+        "profileMode": "exact",
+        "reprofiledColumns": changed,
+        "approximate": {}
+    }
+    if hashes is not None:
+        profile["columnHashes"] = hashes
+    return profile
+
+def _merge_dtype(current: Optional[np.dtype], dtype: np.dtype) -> np.dtype:
+    """Dtype pandas would infer for the whole column given the dtypes of its chunks"""
+    if current is None or current == dtype:
+        return dtype
+    numeric = lambda d: pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d)
+    if numeric(current) and numeric(dtype):
+        return np.dtype('float64')
+    return np.dtype('object')
+
+class ColumnHasher:
+    """Per-column content hashes built one chunk at a time, matching column_hashes of the whole frame"""
+
+    def __init__(self):
+        self.hashers: Dict[str, "hashlib._Hash"] = {}
+        self.logical_types: Dict[str, Optional[str]] = {}
+
+    def update(self, chunk: pd.DataFrame):
+        for col in chunk.columns:
+            self.logical_types[col] = merge_logical_types(self.logical_types.get(col), logical_type(chunk[col]))
+            self.hashers.setdefault(col, hashlib.sha256()).update(_value_hashes(chunk[col]))
+
+    def result(self) -> Dict[str, str]:
+        return {col: _column_digest(hasher.copy(), self.logical_types.get(col)) for col, hasher in self.hashers.items()}
+
+class StreamingProfiler:
+    """
+    Profile a dataset one chunk at a time in bounded memory. Row and null counts and means are
+    exact; value counts stay exact while a column has at most max_value_counts distinct values,
+    after which distinct counts come from HyperLogLog, modes from Misra-Gries and numeric
+    quantiles from a t-digest. The profile lists every approximate statistic with its error bound.
+    """
+
+    def __init__(self, max_value_counts: int = MAX_VALUE_COUNTS, heavy_hitters: int = 256,
+                 hash_columns: bool = False):
+        self.max_value_counts = max_value_counts
+        self.heavy_hitters = heavy_hitters
+        self.row_count = 0
+        self.columns: List[str] = []
+        self.dtypes: Dict[str, np.dtype] = {}
+        self.logical_types: Dict[str, Optional[str]] = {}
+        self.null_counts: Dict[str, int] = {}
+        self.sums: Dict[str, float] = {}
+        self.numeric_counts: Dict[str, int] = {}
+        # Exact value counts, dropped (None) once a column exceeds max_value_counts distinct values
+        self.exact_counts: Dict[str, Optional[pd.Series]] = {}
+        self.distinct: Dict[str, HyperLogLog] = {}
+        self.heavy: Dict[str, MisraGries] = {}
+        self.digests: Dict[str, TDigest] = {}
+        self.hasher = ColumnHasher() if hash_columns else None
+        self.sample: Optional[pd.DataFrame] = None
+
+    def update(self, chunk: pd.DataFrame):
+        if self.sample is None:
+            self.columns = list(chunk.columns)
+            self.sample = chunk.head(SAMPLE_ROWS)
+            for col in self.columns:
+                self.null_counts[col] = 0
+                self.sums[col] = 0.0
+                self.numeric_counts[col] = 0
+                self.exact_counts[col] = pd.Series(dtype=np.int64)
+                self.distinct[col] = HyperLogLog()
+                self.heavy[col] = MisraGries(self.heavy_hitters)
+                self.digests[col] = TDigest()
+
+        self.row_count += len(chunk)
+        if self.hasher is not None:
+            self.hasher.update(chunk)
+        null_counts = chunk.isna().sum()
+        for col in self.columns:
+            values = chunk[col]
+            self.dtypes[col] = _merge_dtype(self.dtypes.get(col), values.dtype)
+            self.logical_types[col] = merge_logical_types(self.logical_types.get(col), logical_type(values))
+            self.null_counts[col] += int(null_counts[col])
+            counts = values.value_counts()
+
+            if pd.api.types.is_numeric_dtype(values.dtype):
+                # Hash numbers as floats so 1 and 1.0 from differently typed chunks count once
+                values = values.astype(np.float64)
+                self.sums[col] += float(values.sum())
+                self.numeric_counts[col] += int(values.count())
+                self.digests[col].update(values)
+
+            self.distinct[col].update(values)
+            self.heavy[col].update_counts(counts)
+            exact = self.exact_counts[col]
+            if exact is not None:
+                exact = exact.add(counts, fill_value=0).astype(np.int64)
+                self.exact_counts[col] = exact if len(exact) <= self.max_value_counts else None
+
+    def result(self) -> Dict[str, Any]:
+        columns = []
+        value_counts = {}
+        approximate = {}
+        for col in self.columns:
+            dtype = self.dtypes[col]
+            null_count = self.null_counts[col]
+            exact = self.exact_counts[col]
+            notes = {}
+            if exact is not None:
+                counts = exact.sort_values(ascending=False, kind="mergesort")
+                unique_values = len(counts)
+                as_key = (lambda k: str(float(k))) if dtype == np.float64 else str
+                value_counts[col] = {as_key(k): int(v) for k, v in counts.items()}
+            else:
+                counts = self.heavy[col].top()
+                unique_values = self.distinct[col].estimate()
+                notes["unique_values"] = {
+                    "method": "hyperloglog",
+                    "relativeError": round(self.distinct[col].relative_error, 4)
+                }
+
+            col_info = {
+                "name": col,
+                "type": self.logical_types.get(col) or "float64",
+                "unique_values": unique_values,
+                "missing_count": null_count
+            }
+
+            if pd.api.types.is_numeric_dtype(dtype):
+                if unique_values < 10 and pd.api.types.is_integer_dtype(dtype):
+                    col_info["semantic_type"] = "categorical_numeric"
+                else:
+                    col_info["semantic_type"] = "numeric"
+                count = self.numeric_counts[col]
+                col_info["mean"] = self.sums[col] / count if count else None
+                digest = self.digests[col]
+                if exact is None and count:
+                    col_info["quantiles"] = {f"p{int(q * 100)}": digest.quantile(q) for q in (0.25, 0.5, 0.75)}
+                    notes["quantiles"] = {"method": "t-digest", "rankError": round(digest.rank_error, 4)}
+            else:
+                if unique_values < self.row_count * 0.5:
+                    col_info["semantic_type"] = "categorical"
+                else:
+                    col_info["semantic_type"] = "text"
+                col_info["mode"] = _mode_from_counts(counts)
+                if exact is None:
+                    notes["mode"] = {"method": "misra-gries", "maxCountError": self.heavy[col].max_error}
+
+            if notes:
+                approximate[col] = notes
+            columns.append(col_info)
+
+        sample = self.sample if self.sample is not None else pd.DataFrame()
+        profile = {
+            "rowCount": self.row_count,
+            "columnCount": len(self.columns),
+            "columns": columns,
+            "dtypes": {col: str(dtype) for col, dtype in self.dtypes.items()},
+            "nullCounts": dict(self.null_counts),
+            "valueCounts": value_counts,
+            "sampleRows": json.loads(sample.to_json(orient='records', date_format='iso')),
+            "profileMode": "streaming",
+            "reprofiledColumns": list(self.columns),
+            "approximate": approximate
+        }
+        if self.hasher is not None:
+            profile["columnHashes"] = self.hasher.result()
+        return profile
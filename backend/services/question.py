@@ -2,6 +2,11 @@ from nanoid import generate
 from services.dynamodb import dynamodb_service
 from services.openai import openai_service
 from services.s3 import s3_service
+from services.dataset import dataset_service
+from services.preprocessing import preprocessing_service
+from services.dataset_versions import dataset_version_service
+from services.feature_stats import MAX_STAT_ROWS, feature_report, ranked_table
+from services.formats import DATASET_SUFFIXES
 from models import (
     QuestionResponse, AnswerResponse, QuestionType, 
     AIQuestionGenerationResponse, DatasetSummaryResponse
@@ -9,9 +14,6 @@ from models import (
 from typing import Dict, List, Any, Optional
 import logging
 import json
-import io
-import copy
-import pandas as pd
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +22,7 @@ class QuestionService:
         self.db = dynamodb_service
         self.ai = openai_service
         self.s3 = s3_service
+        self.datasets = dataset_service
 
     def generate_question_id(self) -> str:
         """Generate a unique question ID"""
@@ -153,8 +156,8 @@ class QuestionService:
                     subtaskIndex=subtask_index,
                     questionType=QuestionType.FILE,
                     questionText=ai_response.question,
-                    fileTypes=[".csv"],
-                    maxFileSize=5 * 1024 * 1024,  # 5MB
+                    fileTypes=list(DATASET_SUFFIXES),
+                    maxFileSize=self.s3.max_upload_size,
                     isRequired=True
                 )
             }
@@ -163,7 +166,7 @@ class QuestionService:
             # Task 2, Subtask 2: Dataset summary
             csv_answer = self.db.get_specific_answer(user_email, project_id, 2, 0)
             file_key = csv_answer["answer"].get("fileUrl", "")
-            summary = self.s3.get_dataset_summary(file_key)
+            summary = self.datasets.get_dataset_summary(file_key)
             if not summary:
                 return {"success": False, "message": "Failed to generate dataset summary"}
             
@@ -187,9 +190,9 @@ class QuestionService:
             if not file_key:
                 return {"success": False, "message": "CSV file not found"}
             
-            is_valid, message, csv_data = self.s3.validate_and_process_csv(file_key)
-            if not is_valid:
-                return {"success": False, "message": message}
+            csv_data = self.datasets.get_sample_rows(file_key)
+            if not csv_data:
+                return {"success": False, "message": "Failed to load dataset profile"}
             
             ai_response = self.ai.generate_target_columns(csv_data, context)
             if not ai_response.success:
@@ -221,9 +224,10 @@ class QuestionService:
             target_column = target_answer["answer"].get("userResponse", "")
             csv_answer = self.db.get_specific_answer(user_email, project_id, 2, 0)
             file_key = csv_answer["answer"].get("fileUrl", "")
-            _, _, csv_data = self.s3.validate_and_process_csv(file_key)
+            csv_data = self.datasets.get_prompt_sample(file_key) or []
+            target_stats = self._target_stats(file_key, target_column)
             
-            ai_response = self.ai.detect_problem_type(target_column, csv_data, context)
+            ai_response = self.ai.detect_problem_type(target_column, csv_data, context, target_stats)
             if not ai_response.success:
                 return {"success": False, "message": ai_response.error}
             
@@ -243,6 +247,35 @@ class QuestionService:
 
         return {"success": False, "message": f"Unknown Task 2 subtask: {subtask_index}"}
 
+    def _target_stats(self, file_key: str, target_column: str) -> Optional[Dict[str, Any]]:
+        """Cardinality of the target over the whole dataset, from its profile"""
+        profile = self.datasets.get_profile(file_key)
+        if not profile:
+            return None
+        info = next((col for col in profile["columns"] if col["name"] == target_column), None)
+        if info is None:
+            return None
+        counts = profile["valueCounts"].get(target_column)
+        return {
+            "dtype": info["type"],
+            "rowCount": profile["rowCount"],
+            "missingCount": info["missing_count"],
+            "uniqueValues": len(counts) if counts is not None else info["unique_values"],
+            "approximate": counts is None and target_column in profile.get("approximate", {}),
+            "topValues": dict(list(counts.items())[:10]) if counts is not None else None
+        }
+
+    def _feature_report(self, file_key: str, target_column: str) -> List[Dict[str, Any]]:
+        """Locally ranked feature statistics against the target, empty when they can't be computed"""
+        try:
+            df = self.datasets.load_row_sample(file_key, MAX_STAT_ROWS)
+            if target_column not in df.columns:
+                return []
+            return feature_report(df, target_column)
+        except Exception as e:
+            logger.warning(f"Feature statistics failed for {file_key}: {e}")
+            return []
+
     def _generate_task3_question(self, user_email: str, project_id: str, subtask_index: int, question_id: str, context: str) -> Dict:
         """Generate Task 3 questions (Feature Engineering)"""
         try:
@@ -255,17 +288,28 @@ class QuestionService:
                 target_column = target_answer["answer"].get("userResponse", "")
                 csv_answer = self.db.get_specific_answer(user_email, project_id, 2, 0)
                 file_key = csv_answer["answer"].get("fileUrl", "")
-                is_valid, message, csv_data = self.s3.validate_and_process_csv(file_key)
-                if not is_valid:
-                    return {"success": False, "message": message}
+                csv_data = self.datasets.get_prompt_sample(file_key)
+                if not csv_data:
+                    return {"success": False, "message": "Failed to load dataset profile"}
                 
-                ai_response = self.ai.generate_feature_columns(csv_data, target_column, context)
-                if not ai_response.success:
+                report = self._feature_report(file_key, target_column)
+                ai_response = self.ai.generate_feature_columns(
+                    csv_data, target_column, context, feature_table=ranked_table(report) if report else None
+                )
+                feature_columns = ai_response.featuresColumns if ai_response.success else []
+                if not feature_columns and report:
+                    # The local ranking stands in when the AI gives no usable answer
+                    feature_columns = [item["column"] for item in report if not item["leakage"]]
+                if not ai_response.success and not feature_columns:
                     return {"success": False, "message": ai_response.error}
                 
-                if not ai_response.featuresColumns:
+                if not feature_columns:
                     return {"success": False, "message": "No suitable feature columns found"}
                 
+                if report:
+                    rank = {item["column"]: item["rank"] for item in report}
+                    feature_columns = sorted(feature_columns, key=lambda col: rank.get(col, len(rank) + 1))
+                
                 return {
                     "success": True,
                     "question": QuestionResponse(
@@ -274,7 +318,7 @@ class QuestionService:
                         subtaskIndex=subtask_index,
                         questionType=QuestionType.MULTISELECT,
                         questionText="Which columns should the model use to make predictions? (Select all that apply)",
-                        options=ai_response.featuresColumns,
+                        options=feature_columns,
                         isRequired=True
                     )
                 }
@@ -353,8 +397,9 @@ class QuestionService:
                     target_column = target_answer["answer"].get("userResponse", "")
                     csv_answer = self.db.get_specific_answer(user_email, project_id, 2, 0)
                     file_key = csv_answer["answer"].get("fileUrl", "")
-                    _, _, csv_data = self.s3.validate_and_process_csv(file_key)
-                    ai_response = self.ai.detect_problem_type(target_column, csv_data, context)
+                    csv_data = self.datasets.get_prompt_sample(file_key) or []
+                    target_stats = self._target_stats(file_key, target_column)
+                    ai_response = self.ai.detect_problem_type(target_column, csv_data, context, target_stats)
                     is_classification = ai_response.problemType == "classification"
                 
                 if not is_classification:
@@ -592,23 +637,21 @@ class QuestionService:
     def _calculate_missing_values_impact(self, file_key: str, target_column: str, prediction_columns: List[str]) -> Dict[str, Any]:
         """Calculate impact of missing values on target and prediction columns"""
         try:
-            response = self.s3.s3_client.get_object(Bucket=self.s3.bucket_name, Key=file_key)
-            file_content = response['Body'].read()
-            csv_string = file_content.decode('utf-8')
-            df = pd.read_csv(io.StringIO(csv_string))
-            
             # Focus on target + prediction columns
             relevant_columns = [target_column] + prediction_columns
-            subset_df = df[relevant_columns]
+            profile = self.datasets.get_profile(file_key)
+            total_rows = profile["rowCount"]
             
-            # Count rows with any missing values in these columns
-            rows_with_missing = subset_df.isnull().any(axis=1).sum()
-            total_rows = len(df)
+            # Missing per column comes straight from the profile
+            missing_per_column = {col: int(profile["nullCounts"][col]) for col in relevant_columns}
+            columns_with_missing = [col for col in relevant_columns if missing_per_column[col] > 0]
             
-            # Calculate missing per column
-            missing_per_column = {}
-            for col in relevant_columns:
-                missing_per_column[col] = int(df[col].isnull().sum())  # Convert to Python int
+            # Count rows with any missing values in these columns; only overlapping
+            # nulls across several columns need the row-level null bitmaps
+            if len(columns_with_missing) <= 1:
+                rows_with_missing = sum(missing_per_column[col] for col in columns_with_missing)
+            else:
+                rows_with_missing = self.datasets.get_null_index(file_key).rows_with_nulls(columns_with_missing)
             
             drop_percentage = (rows_with_missing / total_rows) * 100 if total_rows > 0 else 0
             
@@ -635,14 +678,16 @@ class QuestionService:
     def _analyze_class_distribution(self, file_key: str, target_column: str) -> Dict[str, Any]:
         """Analyze class distribution for imbalance detection"""
         try:
-            response = self.s3.s3_client.get_object(Bucket=self.s3.bucket_name, Key=file_key)
-            file_content = response['Body'].read()
-            csv_string = file_content.decode('utf-8')
-            df = pd.read_csv(io.StringIO(csv_string))
+            profile = self.datasets.get_profile(file_key)
             
-            # Get class distribution
-            class_counts = df[target_column].value_counts().to_dict()
-            total_samples = len(df)
+            # Get class distribution (profile keeps value counts for low-cardinality columns)
+            if target_column in profile["valueCounts"]:
+                class_counts = profile["valueCounts"][target_column]
+                total_samples = profile["rowCount"]
+            else:
+                df = self.datasets.load_columns(file_key, [target_column])
+                class_counts = df[target_column].value_counts().to_dict()
+                total_samples = len(df)
             num_classes = len(class_counts)
             
             # Calculate percentages
@@ -809,6 +854,13 @@ class QuestionService:
                 else:
                     user_response = "No hyperparameters configured"
 
+            # A re-upload replaces the project's dataset; remember which one for versioning
+            previous_file_key = None
+            if task_index == 2 and subtask_index == 0 and file_url:
+                previous_answer = self.db.get_specific_answer(user_email, project_id, 2, 0)
+                if previous_answer["success"]:
+                    previous_file_key = previous_answer["answer"].get("fileUrl")
+
             # DEBUG BEFORE DATABASE CALL
             logger.info(f"BEFORE DATABASE SAVE:")
             logger.info(f"  - user_response: {user_response}")
@@ -858,47 +910,35 @@ class QuestionService:
                 return save_result
 
             # Update context for LLM
-            # Special handling for Task 2, Subtask 1 (Data Summary): append full dataset summary as JSON
-            if task_index == 2 and subtask_index == 1:
-                # Get the CSV file key from the answer to subtask 0
-                csv_answer = self.db.get_specific_answer(user_email, project_id, task_index, 0)
-                file_key = csv_answer["answer"].get("fileUrl", "")
-                summary = self.s3.get_dataset_summary(file_key)
-                if summary:
-                    try:
-                        response = self.s3.s3_client.get_object(Bucket=self.s3.bucket_name, Key=file_key)
-                        file_content = response['Body'].read()
-                        csv_string = file_content.decode('utf-8')
-                        df = pd.read_csv(io.StringIO(csv_string))
-                        summary_for_llm = copy.deepcopy(summary)
-                        summary_for_llm['dataPreview'] = df.head(10).to_dict('records')
-                    except Exception as e:
-                        summary_for_llm = summary
-                    context_addition = f"\n\nDATASET_SUMMARY_JSON: {json.dumps(summary_for_llm)}\n\n"
-                else:
-                    context_addition = ""
-            # Special handling for Task 4 slider to ensure split is recorded properly
-            elif task_index == 4 and subtask_index == 0 and answer_type == "slider":
-                if slider_value is not None:
-                    context_addition = f"\n\nTRAIN_TEST_SPLIT: Train {slider_value}%, Test {100-slider_value}%\n\n"
-                else:
-                    context_addition = f"\n\nTRAIN_TEST_SPLIT: Default 80% Train, 20% Test\n\n"
-            else:
-                # For readonly questions, use "User clicked Proceed"
-                display_response = "User clicked Proceed" if answer_type == "readonly" else user_response
-                
-                # For multiselect, show the selected options
-                if answer_type == "multiselect" and selected_options:
-                    display_response = ", ".join(selected_options)
-                
-                context_addition = self.ai.build_context_string(
-                    question=question_text,
-                    user_response=display_response,
-                    csv_preview=self._get_csv_preview_for_context(file_url) if answer_type == "file" else None
-                )
-
+            context_addition = self._context_addition(
+                user_email, project_id, task_index, subtask_index, answer_type, question_text,
+                user_response, selected_options, file_url, slider_value
+            )
             new_context = current_context + context_addition
 
+            # A new dataset version only invalidates the stored questions built from what changed
+            if task_index == 2 and subtask_index == 0 and file_url and file_url != previous_file_key:
+                versioned = dataset_version_service.record_upload(user_email, project_id, file_url, previous_file_key)
+                if not versioned["success"]:
+                    logger.warning(f"Dataset version not recorded for project {project_id}: {versioned['message']}")
+                # The context still describes the replaced dataset and any deleted answers
+                if previous_file_key:
+                    rebuilt = self.rebuild_context(user_email, project_id)
+                    if rebuilt["success"]:
+                        new_context = rebuilt["context"]
+                    else:
+                        logger.warning(f"Failed to rebuild context for project {project_id}: {rebuilt['message']}")
+            # The last Task 3 answer completes the choice set; materialize it for Task 4 and downloads
+            elif task_index == 3 and subtask_index == 3:
+                prepared = preprocessing_service.prepare_project(user_email, project_id)
+                if not prepared["success"]:
+                    logger.warning(f"Preprocessing not materialized for project {project_id}: {prepared['message']}")
+            # The slider fixes the split; store its indices once for code generation, previews and evaluation
+            elif task_index == 4 and subtask_index == 0 and slider_value is not None:
+                prepared = preprocessing_service.prepare_split(user_email, project_id, slider_value)
+                if not prepared["success"]:
+                    logger.warning(f"Train/test split not materialized for project {project_id}: {prepared['message']}")
+
             # Update project context
             context_result = self.db.update_project_context(user_email, project_id, new_context)
             
@@ -918,6 +958,59 @@ class QuestionService:
                 "message": f"Failed to submit answer: {str(e)}"
             }
 
+    def _context_addition(self, user_email: str, project_id: str, task_index: int, subtask_index: int,
+                          answer_type: str, question_text: str, user_response: Optional[str],
+                          selected_options: Optional[List[str]], file_url: Optional[str],
+                          slider_value: Optional[int]) -> str:
+        """Text an answer adds to the project's LLM context"""
+        # Special handling for Task 2, Subtask 1 (Data Summary): append full dataset summary as JSON
+        if task_index == 2 and subtask_index == 1:
+            # Get the CSV file key from the answer to subtask 0
+            csv_answer = self.db.get_specific_answer(user_email, project_id, task_index, 0)
+            file_key = csv_answer["answer"].get("fileUrl", "")
+            summary_for_llm = self.datasets.get_dataset_summary(file_key, preview_rows=10)
+            if summary_for_llm:
+                return f"\n\nDATASET_SUMMARY_JSON: {json.dumps(summary_for_llm)}\n\n"
+            else:
+                return ""
+        # Special handling for Task 4 slider to ensure split is recorded properly
+        elif task_index == 4 and subtask_index == 0 and answer_type == "slider":
+            if slider_value is not None:
+                return f"\n\nTRAIN_TEST_SPLIT: Train {slider_value}%, Test {100-slider_value}%\n\n"
+            else:
+                return f"\n\nTRAIN_TEST_SPLIT: Default 80% Train, 20% Test\n\n"
+        else:
+            # For readonly questions, use "User clicked Proceed"
+            display_response = "User clicked Proceed" if answer_type == "readonly" else user_response
+
+            # For multiselect, show the selected options
+            if answer_type == "multiselect" and selected_options:
+                display_response = ", ".join(selected_options)
+
+            return self.ai.build_context_string(
+                question=question_text,
+                user_response=display_response,
+                csv_preview=self._get_csv_preview_for_context(file_url) if answer_type == "file" else None
+            )
+
+    def rebuild_context(self, user_email: str, project_id: str) -> Dict:
+        """Rebuild the project's LLM context from its stored answers, dropping text of deleted ones"""
+        answers_result = self.db.get_project_answers(user_email, project_id)
+        if not answers_result["success"]:
+            return answers_result
+
+        answers = sorted(answers_result["answers"], key=lambda item: (int(item["taskIndex"]), int(item["subtaskIndex"])))
+        context = "".join(
+            self._context_addition(
+                user_email, project_id, int(item["taskIndex"]), int(item["subtaskIndex"]),
+                item.get("questionType", "text"), item.get("questionText", ""), item.get("userResponse"),
+                item.get("selectedOptions"), item.get("fileUrl"),
+                int(item["sliderValue"]) if item.get("sliderValue") is not None else None
+            )
+            for item in answers
+        )
+        return {"success": True, "context": context}
+
     def _get_question_text(self, user_email: str, project_id: str, task_index: int, subtask_index: int) -> Dict:
         """Helper to get question text for context building"""
         # This is a simplified version - in practice, you might want to store questions separately
@@ -932,10 +1025,10 @@ class QuestionService:
             return None
         
         try:
-            file_key = file_url.split("/")[-1]
-            is_valid, message, csv_data = self.s3.validate_and_process_csv(file_key)
+            # fileUrl holds the full S3 key of the upload
+            csv_data = self.datasets.get_sample_rows(file_url)
             
-            if is_valid and csv_data:
+            if csv_data:
                 # Return first 3 rows as preview
                 preview_data = csv_data[:3]
                 return json.dumps(preview_data, indent=2)
@@ -1,25 +1,70 @@
-import boto3
 from botocore.exceptions import ClientError
 from config import settings
-from typing import Dict, List, Any, Optional, Tuple
+from services.aws import aws_client_factory
+from services.formats import is_dataset_upload, content_type_for
+from typing import Dict, Any, Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 import logging
-import pandas as pd
 import io
-import json
+import math
+import re
+import base64
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Most keys a single delete_objects call accepts
+DELETE_BATCH_SIZE = 1000
+SHA256_HEX = re.compile(r'^[0-9a-f]{64}$')
+
+class S3ObjectReader(io.RawIOBase):
+    """Seekable file-like view of an S3 object that fetches only the byte ranges that are read"""
+
+    def __init__(self, s3_client, bucket_name: str, key: str, size: int, etag: Optional[str] = None):
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.size = size
+        self.etag = etag
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        else:
+            self.position = self.size + offset
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        if self.position >= self.size:
+            return 0
+        end = min(self.position + len(buffer), self.size) - 1
+        params = {'Bucket': self.bucket_name, 'Key': self.key, 'Range': f"bytes={self.position}-{end}"}
+        if self.etag:
+            params['IfMatch'] = self.etag
+        data = self.s3_client.get_object(**params)['Body'].read()
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
 class S3Service:
     def __init__(self):
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.aws_access_key_id,
-            aws_secret_access_key=settings.aws_secret_access_key,
-            region_name=settings.aws_region
-        )
+        self.s3_client = aws_client_factory.client('s3')
         self.bucket_name = settings.s3_bucket_name
-        self.max_file_size = 5 * 1024 * 1024  # 5MB in bytes
+        self.max_file_size = 5 * 1024 * 1024  # 5MB in bytes, largest dataset parsed fully in memory
+        self.max_upload_size = settings.max_upload_size
+        self.multipart_part_size = settings.multipart_part_size
         
         # Ensure bucket exists
         self._ensure_bucket_exists()
@@ -49,30 +94,50 @@ class S3Service:
                 logger.error(f"Error checking S3 bucket: {e}")
                 raise
 
+    def _build_file_key(self, user_email: str, project_id: str, task_index: int,
+                        subtask_index: int, file_name: str) -> str:
+        """Generate unique file key"""
+        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        return f"projects/{user_email}/{project_id}/task_{task_index}_subtask_{subtask_index}_{timestamp}_{file_name}"
+
+    def owns_file_key(self, user_email: str, project_id: str, file_key: str) -> bool:
+        """Check a client-supplied key lives under the caller's project prefix"""
+        return file_key.startswith(f"projects/{user_email}/{project_id}/")
+
     def generate_presigned_upload_url(self, user_email: str, project_id: str, 
                                     task_index: int, subtask_index: int, 
-                                    file_name: str) -> Dict[str, Any]:
-        """Generate presigned URL for file upload"""
+                                    file_name: str, content_sha256: Optional[str] = None) -> Dict[str, Any]:
+        """Generate presigned URL for file upload (S3 verifies the SHA-256 when one is given)"""
         try:
             # Validate file extension
-            if not file_name.lower().endswith('.csv'):
+            if not is_dataset_upload(file_name):
                 return {
                     "success": False,
-                    "message": "Only CSV files are allowed"
+                    "message": "Only CSV (.csv, .csv.gz, .csv.zst), Parquet or Feather files are allowed"
                 }
 
-            # Generate unique file key
-            timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-            file_key = f"projects/{user_email}/{project_id}/task_{task_index}_subtask_{subtask_index}_{timestamp}_{file_name}"
+            if content_sha256 and not SHA256_HEX.match(content_sha256):
+                return {
+                    "success": False,
+                    "message": "content_sha256 must be 64 lowercase hex characters"
+                }
+
+            file_key = self._build_file_key(user_email, project_id, task_index, subtask_index, file_name)
+            params = {
+                'Bucket': self.bucket_name,
+                'Key': file_key,
+                'ContentType': content_type_for(file_name)
+            }
+            headers = {'Content-Type': content_type_for(file_name)}
+            if content_sha256:
+                checksum = base64.b64encode(bytes.fromhex(content_sha256)).decode('ascii')
+                params['ChecksumSHA256'] = checksum
+                headers['x-amz-checksum-sha256'] = checksum
 
             # Generate presigned URL for PUT operation
             presigned_url = self.s3_client.generate_presigned_url(
                 'put_object',
-                Params={
-                    'Bucket': self.bucket_name,
-                    'Key': file_key,
-                    'ContentType': 'text/csv'
-                },
+                Params=params,
                 ExpiresIn=3600,  # 1 hour
                 HttpMethod='PUT'
             )
@@ -80,6 +145,7 @@ class S3Service:
             return {
                 "success": True,
                 "upload_url": presigned_url,
+                "upload_headers": headers,
                 "file_key": file_key,
                 "message": "Upload URL generated successfully"
             }
@@ -91,112 +157,197 @@ class S3Service:
                 "message": f"Failed to generate upload URL: {str(e)}"
             }
 
-    def validate_and_process_csv(self, file_key: str) -> Tuple[bool, str, Optional[List[Dict[str, Any]]]]:
-        """Download and validate CSV file, return sample data"""
+    def copy_upload(self, source_key: str, user_email: str, project_id: str,
+                    task_index: int, subtask_index: int, file_name: str) -> Dict[str, Any]:
+        """Store an already uploaded file under a new project key with a server-side copy"""
         try:
-            # Download file from S3
-            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=file_key)
-            file_content = response['Body'].read()
-
-            # Check file size
-            if len(file_content) > self.max_file_size:
-                return False, "File size exceeds 5MB limit", None
-
-            # Try to read as CSV
-            try:
-                # Decode content
-                csv_string = file_content.decode('utf-8')
-                
-                # Read with pandas
-                df = pd.read_csv(io.StringIO(csv_string))
-                
-                # Basic validation
-                if df.empty:
-                    return False, "CSV file is empty", None
-                
-                if len(df.columns) < 2:
-                    return False, "CSV must have at least 2 columns", None
-                
-                # Check for reasonable number of rows
-                if len(df) < 5:
-                    return False, "CSV must have at least 5 rows of data", None
-
-                # Get sample data (first 50 rows)
-                sample_df = df.head(50)
-                
-                # Convert to list of dictionaries
-                sample_data = sample_df.to_dict('records')
-                
-                return True, "CSV validation successful", sample_data
-
-            except pd.errors.EmptyDataError:
-                return False, "CSV file is empty or invalid", None
-            except pd.errors.ParserError as e:
-                return False, f"CSV parsing error: {str(e)}", None
-            except UnicodeDecodeError:
-                return False, "File encoding not supported. Please use UTF-8 encoded CSV", None
+            file_key = self._build_file_key(user_email, project_id, task_index, subtask_index, file_name)
+            self.s3_client.copy_object(
+                Bucket=self.bucket_name,
+                Key=file_key,
+                CopySource={'Bucket': self.bucket_name, 'Key': source_key},
+                ContentType=content_type_for(file_name),
+                MetadataDirective='REPLACE'
+            )
+            return {
+                "success": True,
+                "file_key": file_key,
+                "message": "Dataset already uploaded, reused the stored copy"
+            }
 
         except ClientError as e:
-            logger.error(f"Error processing CSV from S3: {e}")
-            return False, f"Failed to process file: {str(e)}", None
-        except Exception as e:
-            logger.error(f"Unexpected error processing CSV: {e}")
-            return False, f"Unexpected error: {str(e)}", None
-
-    def get_dataset_summary(self, file_key: str) -> Optional[Dict[str, Any]]:
-        """Generate comprehensive dataset summary"""
+            logger.error(f"Error copying upload {source_key}: {e}")
+            return {
+                "success": False,
+                "message": f"Failed to reuse upload: {str(e)}"
+            }
+
+    def generate_presigned_upload_post(self, user_email: str, project_id: str,
+                                       task_index: int, subtask_index: int,
+                                       file_name: str) -> Dict[str, Any]:
+        """Generate a presigned POST policy; S3 rejects wrong-sized or wrongly typed uploads itself"""
         try:
-            # Download and read CSV
-            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=file_key)
-            file_content = response['Body'].read()
-            csv_string = file_content.decode('utf-8')
-            df = pd.read_csv(io.StringIO(csv_string))
-
-            # Generate summary
-            summary = {
-                "rowCount": len(df),
-                "columnCount": len(df.columns),
-                "columns": [],
-                "missingValues": {},
-                "dataPreview": df.head(5).to_dict('records')
+            if not is_dataset_upload(file_name):
+                return {
+                    "success": False,
+                    "message": "Only CSV (.csv, .csv.gz, .csv.zst), Parquet or Feather files are allowed"
+                }
+
+            file_key = self._build_file_key(user_email, project_id, task_index, subtask_index, file_name)
+
+            presigned_post = self.s3_client.generate_presigned_post(
+                Bucket=self.bucket_name,
+                Key=file_key,
+                Fields={'Content-Type': content_type_for(file_name)},
+                Conditions=[
+                    ['content-length-range', 1, self.max_upload_size],
+                    {'Content-Type': content_type_for(file_name)}
+                ],
+                ExpiresIn=3600  # 1 hour
+            )
+
+            return {
+                "success": True,
+                "upload_url": presigned_post['url'],
+                "upload_fields": presigned_post['fields'],
+                "file_key": file_key,
+                "message": "Upload form generated successfully"
             }
 
-            # Analyze each column
-            for col in df.columns:
-                col_info = {
-                    "name": col,
-                    "type": str(df[col].dtype),
-                    "unique_values": int(df[col].nunique()),
-                    "missing_count": int(df[col].isnull().sum())
+        except ClientError as e:
+            logger.error(f"Error generating presigned POST: {e}")
+            return {
+                "success": False,
+                "message": f"Failed to generate upload form: {str(e)}"
+            }
+
+    def create_multipart_upload(self, user_email: str, project_id: str,
+                                task_index: int, subtask_index: int,
+                                file_name: str, file_size: int) -> Dict[str, Any]:
+        """Start a multipart upload and presign a PUT URL for every part"""
+        try:
+            if not is_dataset_upload(file_name):
+                return {
+                    "success": False,
+                    "message": "Only CSV (.csv, .csv.gz, .csv.zst), Parquet or Feather files are allowed"
                 }
-                
-                # Determine semantic type
-                if pd.api.types.is_numeric_dtype(df[col]):
-                    if df[col].nunique() < 10 and df[col].dtype in ['int64', 'int32']:
-                        col_info["semantic_type"] = "categorical_numeric"
-                    else:
-                        col_info["semantic_type"] = "numeric"
-                    # Add mean for numeric columns
-                    col_info["mean"] = float(df[col].mean()) if df[col].notnull().any() else None
-                elif pd.api.types.is_datetime64_any_dtype(df[col]):
-                    col_info["semantic_type"] = "datetime"
-                    col_info["mode"] = str(df[col].mode().iloc[0]) if not df[col].mode().empty else None
-                else:
-                    if df[col].nunique() < len(df) * 0.5:  # Less than 50% unique values
-                        col_info["semantic_type"] = "categorical"
-                    else:
-                        col_info["semantic_type"] = "text"
-                    # Add mode for non-numeric columns
-                    col_info["mode"] = str(df[col].mode().iloc[0]) if not df[col].mode().empty else None
 
-                summary["columns"].append(col_info)
-                summary["missingValues"][col] = int(df[col].isnull().sum())
+            if file_size <= 0 or file_size > self.max_upload_size:
+                return {
+                    "success": False,
+                    "message": f"File size must be between 1 byte and {self.max_upload_size // (1024 * 1024)}MB"
+                }
+
+            # S3 allows at most 10,000 parts; grow the part size for very large files
+            part_size = max(self.multipart_part_size, math.ceil(file_size / 10000))
+            part_count = math.ceil(file_size / part_size)
+
+            file_key = self._build_file_key(user_email, project_id, task_index, subtask_index, file_name)
+            response = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=file_key,
+                ContentType=content_type_for(file_name)
+            )
+            upload_id = response['UploadId']
+
+            parts = []
+            for part_number in range(1, part_count + 1):
+                parts.append({
+                    "partNumber": part_number,
+                    "url": self.s3_client.generate_presigned_url(
+                        'upload_part',
+                        Params={
+                            'Bucket': self.bucket_name,
+                            'Key': file_key,
+                            'UploadId': upload_id,
+                            'PartNumber': part_number
+                        },
+                        ExpiresIn=3600,  # 1 hour
+                        HttpMethod='PUT'
+                    )
+                })
+
+            return {
+                "success": True,
+                "upload_id": upload_id,
+                "file_key": file_key,
+                "part_size": part_size,
+                "parts": parts,
+                "message": "Multipart upload started successfully"
+            }
+
+        except ClientError as e:
+            logger.error(f"Error starting multipart upload: {e}")
+            return {
+                "success": False,
+                "message": f"Failed to start multipart upload: {str(e)}"
+            }
+
+    def complete_multipart_upload(self, file_key: str, upload_id: str, part_count: int, file_size: int) -> Dict[str, Any]:
+        """
+        Complete a multipart upload from the parts S3 has received (the client doesn't need to track
+        ETags). Parts 1..part_count must all be present and add up to file_size; otherwise the
+        upload is aborted rather than stored truncated.
+        """
+        try:
+            parts = []
+            received_bytes = 0
+            paginator = self.s3_client.get_paginator('list_parts')
+            for page in paginator.paginate(Bucket=self.bucket_name, Key=file_key, UploadId=upload_id):
+                for part in page.get('Parts', []):
+                    parts.append({'PartNumber': part['PartNumber'], 'ETag': part['ETag']})
+                    received_bytes += part['Size']
+
+            received = sorted(part['PartNumber'] for part in parts)
+            if received != list(range(1, part_count + 1)) or received_bytes != file_size:
+                missing = sorted(set(range(1, part_count + 1)) - set(received))
+                logger.error(
+                    f"Incomplete multipart upload {file_key}: {len(received)} of {part_count} parts, "
+                    f"{received_bytes} of {file_size} bytes, missing parts {missing[:10]}"
+                )
+                self.abort_multipart_upload(file_key, upload_id)
+                return {
+                    "success": False,
+                    "message": f"Upload incomplete ({len(received)} of {part_count} parts, "
+                               f"{received_bytes} of {file_size} bytes received). Please upload the file again."
+                }
+
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=file_key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': parts}
+            )
+
+            return {
+                "success": True,
+                "file_key": file_key,
+                "message": f"Upload completed ({len(parts)} parts)"
+            }
 
-            return summary
+        except ClientError as e:
+            logger.error(f"Error completing multipart upload: {e}")
+            return {
+                "success": False,
+                "message": f"Failed to complete upload: {str(e)}"
+            }
 
-        except Exception as e:
-            logger.error(f"Error generating dataset summary: {e}")
-            return None
+    def abort_multipart_upload(self, file_key: str, upload_id: str) -> bool:
+        """Abort a multipart upload and free any stored parts"""
+        try:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=file_key, UploadId=upload_id)
+            return True
+        except ClientError as e:
+            logger.error(f"Error aborting multipart upload: {e}")
+            return False
+
+    def open_object(self, file_key: str, head: Optional[Dict[str, Any]] = None,
+                    buffer_size: int = 1024 * 1024) -> io.BufferedReader:
+        """Open an S3 object for random access using ranged GETs (e.g. for Parquet footers/column chunks)"""
+        if head is None:
+            head = self.s3_client.head_object(Bucket=self.bucket_name, Key=file_key)
+        reader = S3ObjectReader(self.s3_client, self.bucket_name, file_key, head['ContentLength'], head.get('ETag'))
+        return io.BufferedReader(reader, buffer_size=buffer_size)
 
     def get_file_url(self, file_key: str) -> str:
         """Generate presigned URL for file download"""
@@ -220,38 +371,58 @@ class S3Service:
             logger.error(f"Error deleting file from S3: {e}")
             return False
 
-    def cleanup_old_files(self, user_email: str, project_id: str, days_old: int = 30):
-        """Clean up old files for a project"""
-        try:
-            prefix = f"projects/{user_email}/{project_id}/"
-            
-            # List objects with prefix
-            response = self.s3_client.list_objects_v2(
+    def iter_objects(self, prefix: str) -> Iterator[Dict[str, Any]]:
+        """Every object under a prefix, following list_objects_v2 pagination"""
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+            yield from page.get('Contents', [])
+
+    def delete_objects(self, keys: List[str], max_workers: int = 8) -> Dict[str, Any]:
+        """Delete keys in batches of 1000 (the delete_objects limit), several batches at a time"""
+        batches = [keys[i:i + DELETE_BATCH_SIZE] for i in range(0, len(keys), DELETE_BATCH_SIZE)]
+
+        def delete_batch(batch: List[str]) -> List[str]:
+            response = self.s3_client.delete_objects(
                 Bucket=self.bucket_name,
-                Prefix=prefix
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
             )
+            # Quiet mode only reports failures
+            return [error['Key'] for error in response.get('Errors', [])]
 
-            if 'Contents' not in response:
-                return
+        failed: List[str] = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for batch, future in [(b, executor.submit(delete_batch, b)) for b in batches]:
+                try:
+                    failed.extend(future.result())
+                except ClientError as e:
+                    logger.error(f"Error deleting batch of {len(batch)} objects: {e}")
+                    failed.extend(batch)
+
+        return {"deleted": len(keys) - len(failed), "failed": failed}
 
-            # Calculate cutoff date
-            cutoff_date = datetime.now() - timedelta(days=days_old)
+    def cleanup_old_files(self, user_email: str, project_id: str, days_old: int = 30) -> Dict[str, Any]:
+        """Clean up old files for a project"""
+        try:
+            prefix = f"projects/{user_email}/{project_id}/"
+            cutoff_date = datetime.utcnow() - timedelta(days=days_old)
 
-            # Delete old files
-            objects_to_delete = []
-            for obj in response['Contents']:
+            keys = []
+            sizes = {}
+            for obj in self.iter_objects(prefix):
                 if obj['LastModified'].replace(tzinfo=None) < cutoff_date:
-                    objects_to_delete.append({'Key': obj['Key']})
+                    keys.append(obj['Key'])
+                    sizes[obj['Key']] = obj['Size']
 
-            if objects_to_delete:
-                self.s3_client.delete_objects(
-                    Bucket=self.bucket_name,
-                    Delete={'Objects': objects_to_delete}
-                )
-                logger.info(f"Cleaned up {len(objects_to_delete)} old files for project {project_id}")
+            result = self.delete_objects(keys)
+            failed = set(result["failed"])
+            bytes_reclaimed = sum(size for key, size in sizes.items() if key not in failed)
+            if keys:
+                logger.info(f"Cleaned up {result['deleted']} old files ({bytes_reclaimed} bytes) for project {project_id}")
+            return {"deleted": result["deleted"], "failed": len(failed), "bytesReclaimed": bytes_reclaimed}
 
         except ClientError as e:
             logger.error(f"Error cleaning up old files: {e}")
+            return {"deleted": 0, "failed": 0, "bytesReclaimed": 0}
 
 # Global instance
 s3_service = S3Service()
\ No newline at end of file
@@ -0,0 +1,85 @@
+from typing import Any, Dict, List, Optional
+import json
+import numpy as np
+import pandas as pd
+
+# Rough prompt budget for sample rows; ~4 characters of compact JSON per token
+PROMPT_TOKEN_BUDGET = 600
+CHARS_PER_TOKEN = 4
+# Columns with at most this many distinct values are stratified on
+STRATIFY_MAX_UNIQUE = 20
+# Long text values are cut to this many characters in prompts
+MAX_VALUE_CHARS = 60
+# Random rows considered after the stratified ones; far more than any budget admits
+RANDOM_CANDIDATES = 200
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _candidate_rows(df: pd.DataFrame, seed: int) -> List[int]:
+    """
+    Row positions in priority order: one row per value of every low-cardinality column
+    (rarest values first), then one row per null-bearing column, then a seeded shuffle of the
+    rest so sorted files still contribute rows from their whole range.
+    """
+    priority: List[int] = []
+    positions = pd.RangeIndex(len(df))
+    for col in df.columns:
+        values = df[col].reset_index(drop=True)
+        counts = values.value_counts()
+        if 1 < len(counts) <= STRATIFY_MAX_UNIQUE:
+            first = positions.to_series().groupby(values, observed=True, sort=False).first()
+            priority.extend(int(first[value]) for value in counts.index[::-1] if value in first.index)
+
+    nulls = df.isna().to_numpy()
+    for i in range(nulls.shape[1]):
+        hits = np.flatnonzero(nulls[:, i])
+        if len(hits):
+            priority.append(int(hits[0]))
+
+    rest = np.random.default_rng(seed).permutation(len(df))[:RANDOM_CANDIDATES]
+    return list(dict.fromkeys(priority + rest.tolist()))
+
+def _clean(value: Any) -> Any:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, str) and len(value) > MAX_VALUE_CHARS:
+        return value[:MAX_VALUE_CHARS] + "..."
+    return value
+
+def representative_sample(df: pd.DataFrame, token_budget: int = PROMPT_TOKEN_BUDGET,
+                          seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    A small, diverse set of rows that fits the token budget: covers every class of the
+    low-cardinality columns (rare ones included) and shows how missing values look.
+    Rows keep their original order.
+    """
+    if df.empty:
+        return []
+
+    candidates = _candidate_rows(df, seed)
+    columns = [str(col) for col in df.columns]
+    # JSON round-trip gives plain Python values (numpy scalars, timestamps and NaN handled)
+    records = json.loads(df.iloc[candidates].to_json(orient='values', date_format='iso'))
+    used = _estimate_tokens(json.dumps(columns, separators=(',', ':')))
+    chosen = []
+    for position, values in zip(candidates, records):
+        row = [_clean(value) for value in values]
+        cost = _estimate_tokens(json.dumps(row, separators=(',', ':'), default=str))
+        if chosen and used + cost > token_budget:
+            break
+        chosen.append((position, row))
+        used += cost
+
+    return [dict(zip(columns, row)) for _, row in sorted(chosen, key=lambda item: item[0])]
+
+def prompt_table(rows: Optional[List[Dict[str, Any]]]) -> str:
+    """Rows as compact JSON with the column names listed once instead of on every row"""
+    if not rows:
+        return "No data"
+    columns = list(rows[0].keys())
+    return json.dumps(
+        {"columns": columns, "rows": [[row.get(col) for col in columns] for row in rows]},
+        separators=(',', ':'),
+        default=str
+    )
@@ -0,0 +1,68 @@
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# Text columns become `category` when at most this share of their values is distinct
+CATEGORY_MAX_RATIO = 0.5
+CATEGORY_MAX_UNIQUE = 10_000
+
+_INT_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+def _smallest_int(minimum: int, maximum: int, nullable: bool) -> Optional[str]:
+    """
+    Narrowest integer dtype holding [minimum, maximum]; nullable ones use pandas' masked Int types.
+    None when not even int64 does (unsigned values above its range).
+    """
+    for int_type in _INT_TYPES:
+        info = np.iinfo(int_type)
+        if info.min <= minimum and maximum <= info.max:
+            name = np.dtype(int_type).name
+            return name.capitalize() if nullable else name
+    return None
+
+def _infer_column(values: pd.Series) -> str:
+    dtype = values.dtype
+    if pd.api.types.is_bool_dtype(dtype) or not (
+        pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_object_dtype(dtype)
+    ):
+        return str(dtype)
+
+    non_null = values.dropna()
+    if pd.api.types.is_object_dtype(dtype):
+        if non_null.empty or not non_null.map(type).eq(str).all():
+            return "object"
+        unique_values = non_null.nunique()
+        if unique_values <= CATEGORY_MAX_UNIQUE and unique_values <= len(values) * CATEGORY_MAX_RATIO:
+            return "category"
+        return "object"
+
+    if non_null.empty:
+        return str(dtype)
+
+    if pd.api.types.is_integer_dtype(dtype):
+        # Masked Int columns (e.g. from Parquet written by pandas) can hold nulls
+        return _smallest_int(int(non_null.min()), int(non_null.max()), nullable=non_null.size < len(values)) or str(dtype)
+
+    # Floats: whole numbers (typically an int column with gaps) become nullable integers
+    data = non_null.to_numpy(dtype=np.float64)
+    if np.isfinite(data).all() and (data == np.round(data)).all() and np.abs(data).max() < 2 ** 53:
+        return _smallest_int(int(data.min()), int(data.max()), nullable=len(non_null) < len(values))
+
+    # Downcast to float32 only when every value survives the round trip
+    if (data.astype(np.float32).astype(np.float64) == data).all():
+        return "float32"
+    return "float64"
+
+def infer_schema(df: pd.DataFrame) -> Dict[str, str]:
+    """Most compact lossless dtype for every column"""
+    return {col: _infer_column(df[col]) for col in df.columns}
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """Cast the columns named in a schema, leaving columns it doesn't cover untouched"""
+    changes = {col: dtype for col, dtype in schema.items() if col in df.columns and str(df[col].dtype) != dtype}
+    return df.astype(changes) if changes else df
+
+def optimize_dtypes(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """Infer the compact schema of a frame and return the converted frame with it"""
+    schema = infer_schema(df)
+    return apply_schema(df, schema), schema
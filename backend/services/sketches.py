@@ -0,0 +1,128 @@
+"""
+Mergeable streaming sketches used to profile datasets that are too large to load at once.
+
+Each sketch is updated one pandas chunk at a time with vectorized NumPy operations and
+can be merged with another sketch of the same kind, so chunks can be profiled
+independently and combined.
+"""
+from typing import Optional
+import math
+import numpy as np
+import pandas as pd
+
+def _hash_values(values: pd.Series) -> np.ndarray:
+    """Stable 64-bit hashes of the non-null values in a column"""
+    return pd.util.hash_pandas_object(values.dropna(), index=False).to_numpy(dtype=np.uint64)
+
+class HyperLogLog:
+    """Distinct-count estimator; relative standard error is about 1.04 / sqrt(2 ** precision)"""
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def update(self, values: pd.Series):
+        hashes = _hash_values(values)
+        if not len(hashes):
+            return
+        remainder_bits = 64 - self.precision
+        index = (hashes >> np.uint64(remainder_bits)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << remainder_bits) - 1)
+        # Position of the leftmost 1-bit in the remainder (remainder < 2**52 is exact in float64)
+        _, exponent = np.frexp(remainder.astype(np.float64))
+        rank = (remainder_bits - exponent + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog"):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+class MisraGries:
+    """Heavy-hitter summary; every reported count underestimates the true one by at most total / (k + 1)"""
+
+    def __init__(self, k: int = 256):
+        self.k = k
+        self.counts = pd.Series(dtype=np.int64)
+        self.total = 0
+
+    @property
+    def max_error(self) -> int:
+        return self.total // (self.k + 1)
+
+    def update_counts(self, counts: pd.Series, total: Optional[int] = None):
+        """Fold in the value counts of one chunk (exact, or another summary's with its true total)"""
+        self.counts = self.counts.add(counts, fill_value=0).astype(np.int64)
+        self.total += int(counts.sum()) if total is None else total
+        if len(self.counts) > self.k:
+            # Subtract the (k+1)-th largest count from every counter and drop the non-positive ones
+            cut = self.counts.nlargest(self.k + 1).iloc[-1]
+            self.counts = self.counts[self.counts > cut] - cut
+
+    def update(self, values: pd.Series):
+        self.update_counts(values.value_counts())
+
+    def merge(self, other: "MisraGries"):
+        self.update_counts(other.counts, other.total)
+
+    def top(self, n: int = 10) -> pd.Series:
+        return self.counts.sort_values(ascending=False, kind="mergesort").head(n)
+
+class TDigest:
+    """Merging t-digest for quantiles; centroids stay small near the tails (k1 scale function)"""
+
+    def __init__(self, compression: float = 200.0):
+        self.compression = compression
+        self.means = np.empty(0, dtype=np.float64)
+        self.weights = np.empty(0, dtype=np.float64)
+
+    @property
+    def total_weight(self) -> float:
+        return float(self.weights.sum())
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray):
+        order = np.argsort(means, kind="mergesort")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # Quantile at each centroid's midpoint mapped through k1(q) = delta / (2 pi) * asin(2q - 1);
+        # centroids falling in the same unit interval of k are merged
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+        bins = np.floor(k).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+        merged_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / merged_weights
+        self.weights = merged_weights
+
+    def update(self, values: pd.Series):
+        data = pd.to_numeric(values, errors="coerce").dropna().to_numpy(dtype=np.float64)
+        if not len(data):
+            return
+        self._compress(np.concatenate([self.means, data]), np.concatenate([self.weights, np.ones(len(data))]))
+
+    def merge(self, other: "TDigest"):
+        if len(other.means):
+            self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not len(self.means):
+            return None
+        positions = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        return float(np.interp(q, positions, self.means))
+
+    @property
+    def rank_error(self) -> float:
+        """Rough bound on the quantile rank error for the chosen compression"""
+        return 1.0 / self.compression
@@ -0,0 +1,207 @@
+from botocore.exceptions import ClientError
+from config import settings
+from services.aws import aws_client_factory
+from services.dataset import dataset_service
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+import queue
+import threading
+import json
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Job states reported by the status endpoint
+QUEUED = "queued"
+PROCESSING = "processing"
+READY = "ready"
+INVALID = "invalid"
+FAILED = "failed"
+
+class LocalQueueBackend:
+    """In-process queue; jobs are lost on restart and are only seen by this process's workers"""
+
+    def __init__(self):
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+
+    def send(self, message: Dict[str, Any]):
+        self._queue.put(message)
+
+    def receive(self, wait_seconds: int) -> List[Tuple[Dict[str, Any], Any]]:
+        try:
+            return [(self._queue.get(timeout=wait_seconds), None)]
+        except queue.Empty:
+            return []
+
+    def ack(self, receipt: Any):
+        pass
+
+class SQSQueueBackend:
+    """SQS queue shared by every API process; a message is deleted only after its job finishes"""
+
+    def __init__(self, queue_url: str, visibility_timeout: int):
+        self.sqs_client = aws_client_factory.client('sqs')
+        self.queue_url = queue_url
+        self.visibility_timeout = visibility_timeout
+
+    def send(self, message: Dict[str, Any]):
+        self.sqs_client.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(message))
+
+    def receive(self, wait_seconds: int) -> List[Tuple[Dict[str, Any], Any]]:
+        response = self.sqs_client.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=1,
+            WaitTimeSeconds=wait_seconds,
+            VisibilityTimeout=self.visibility_timeout
+        )
+        return [(json.loads(m['Body']), m['ReceiptHandle']) for m in response.get('Messages', [])]
+
+    def ack(self, receipt: Any):
+        self.sqs_client.delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt)
+
+def validate_upload(file_key: str, user_email: str, project_id: str) -> Dict[str, Any]:
+    """
+    Validate an upload and build its sidecar and profile. Returns the job result:
+    status (ready/invalid), message and validationDetails.
+    """
+    # Validate and process CSV
+    is_valid, message, csv_data = dataset_service.validate_and_process_csv(file_key)
+    if not is_valid:
+        return {"status": INVALID, "message": message}
+
+    # Store a typed Parquet copy and the dataset profile that later questions read.
+    # Validation only streams the head of the file, so this is the first full parse.
+    # A re-upload re-profiles only the columns that differ from the project's current dataset.
+    from services.dynamodb import dynamodb_service
+    current_answer = dynamodb_service.get_specific_answer(user_email, project_id, 2, 0)
+    previous_file_key = current_answer["answer"].get("fileUrl") if current_answer["success"] else None
+    profile = dataset_service.process_upload(file_key, previous_file_key)
+    if not profile:
+        return {"status": INVALID, "message": "Failed to process the dataset. Please check the file is a well-formed CSV."}
+
+    # Get project context for AI validation
+    project_result = dynamodb_service.get_project(user_email, project_id)
+
+    if project_result["success"]:
+        context = project_result["project"].get("context_for_LLM", "")
+
+        # Identical bytes validated before for the same project goals reuse the stored verdict
+        verdict = dataset_service.get_validation(file_key, context)
+
+        if verdict is None:
+            # AI validation on representative rows from the whole file, not just its head
+            from services.openai import openai_service
+            sample = dataset_service.get_prompt_sample(file_key) or csv_data
+            ai_is_valid, ai_message = openai_service.validate_csv_content(sample, context)
+            # Only approvals are stored; rejections may come from a transient API failure
+            if ai_is_valid:
+                dataset_service.save_validation(file_key, context, ai_is_valid, ai_message)
+        else:
+            ai_is_valid, ai_message = verdict
+        if not ai_is_valid:
+            return {"status": INVALID, "message": ai_message}
+
+    return {
+        "status": READY,
+        "message": "File validation successful",
+        "validationDetails": {
+            "rowCount": profile["rowCount"],
+            "columnCount": profile["columnCount"],
+            "columns": list(profile["dtypes"])
+        }
+    }
+
+class UploadPipeline:
+    """Background validation and profiling of confirmed uploads, with pollable per-upload status"""
+
+    def __init__(self):
+        self.s3 = dataset_service.s3
+        if settings.upload_queue_backend == "sqs":
+            self.backend = SQSQueueBackend(settings.upload_queue_url, settings.upload_queue_visibility_timeout)
+        else:
+            self.backend = LocalQueueBackend()
+        self.worker_count = settings.upload_workers
+        self._workers: List[threading.Thread] = []
+        self._stopping = threading.Event()
+
+    def status_key(self, file_key: str) -> str:
+        """S3 key of the job status document, readable from any process"""
+        return f"{file_key}.status.json"
+
+    def _set_status(self, file_key: str, status: Dict[str, Any]):
+        status = {**status, "fileKey": file_key, "updatedAt": datetime.utcnow().isoformat()}
+        self.s3.s3_client.put_object(
+            Bucket=self.s3.bucket_name,
+            Key=self.status_key(file_key),
+            Body=json.dumps(status).encode('utf-8'),
+            ContentType='application/json'
+        )
+
+    def get_status(self, file_key: str) -> Optional[Dict[str, Any]]:
+        """Current job status, or None when the upload was never enqueued"""
+        try:
+            response = self.s3.s3_client.get_object(Bucket=self.s3.bucket_name, Key=self.status_key(file_key))
+            return json.loads(response['Body'].read())
+        except ClientError as e:
+            if e.response['Error']['Code'] not in ('404', 'NoSuchKey', 'NotFound'):
+                logger.error(f"Error reading upload status for {file_key}: {e}")
+            return None
+
+    def enqueue(self, file_key: str, user_email: str, project_id: str) -> Dict[str, Any]:
+        """Record the upload as queued and hand it to the workers"""
+        status = {"status": QUEUED, "message": "Waiting to be processed"}
+        self._set_status(file_key, status)
+        self.backend.send({"fileKey": file_key, "userEmail": user_email, "projectId": project_id})
+        logger.info(f"Queued upload {file_key}")
+        return status
+
+    def process(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        file_key = job["fileKey"]
+        self._set_status(file_key, {"status": PROCESSING, "message": "Validating and profiling the dataset"})
+        try:
+            result = validate_upload(file_key, job["userEmail"], job["projectId"])
+        except Exception as e:
+            logger.error(f"Upload job failed for {file_key}: {e}")
+            result = {"status": FAILED, "message": "Failed to process the dataset"}
+        self._set_status(file_key, result)
+        return result
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                messages = self.backend.receive(wait_seconds=5)
+            except Exception as e:
+                logger.error(f"Error receiving upload jobs: {e}")
+                self._stopping.wait(5)
+                continue
+
+            for job, receipt in messages:
+                try:
+                    self.process(job)
+                except Exception as e:
+                    # Usually a status write failing; the job is not acked so SQS redelivers it after the
+                    # visibility timeout (the local queue can't redeliver, so the upload stays unprocessed)
+                    logger.error(f"Upload job {job.get('fileKey')} did not complete, leaving it for redelivery: {e}")
+                    continue
+                try:
+                    self.backend.ack(receipt)
+                except Exception as e:
+                    logger.error(f"Error acknowledging upload job {job.get('fileKey')}: {e}")
+
+    def start(self):
+        """Start the worker threads (called once on application startup)"""
+        self._stopping.clear()
+        for i in range(self.worker_count - len(self._workers)):
+            worker = threading.Thread(target=self._work, name=f"upload-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        logger.info(f"Started {len(self._workers)} upload workers ({settings.upload_queue_backend} queue)")
+
+    def stop(self):
+        self._stopping.set()
+        for worker in self._workers:
+            worker.join(timeout=10)
+        self._workers = []
+
+# Global instance
+upload_pipeline = UploadPipeline()
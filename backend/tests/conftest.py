@@ -0,0 +1,18 @@
+import os
+
+from moto import mock_aws
+
+# Settings are read from the environment on import; unit tests never reach AWS or OpenAI
+for name, value in {
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "AWS_REGION": "us-east-2",
+    "COGNITO_USER_POOL_ID": "test",
+    "COGNITO_APP_CLIENT_ID": "test",
+    "OPENAI_API_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
+
+# Service singletons create their AWS clients (and the S3 bucket) when first imported
+_aws = mock_aws()
+_aws.start()
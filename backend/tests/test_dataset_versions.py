@@ -0,0 +1,48 @@
+from services.dataset_versions import stale_questions
+
+
+def _diff(**overrides):
+    return {"schemaChanged": False, "rowCountChanged": False, "added": [], "removed": [],
+            "changed": [], "retyped": [], **overrides}
+
+
+ANSWERS = {
+    (1, 0): {},
+    (2, 2): {"userResponse": "label"},
+    (2, 3): {},
+    (3, 0): {"selectedOptions": ["age", "city"]},
+    (3, 1): {},
+    (3, 3): {},
+    (4, 1): {},
+}
+
+
+def test_unrelated_change_keeps_every_answer():
+    assert stale_questions(_diff(changed=["income"]), ANSWERS) == []
+
+
+def test_schema_change_resets_from_target_question():
+    assert stale_questions(_diff(schemaChanged=True, added=["extra"]), ANSWERS) == [
+        (2, 2), (2, 3), (3, 0), (3, 1), (3, 3), (4, 1)
+    ]
+
+
+def test_feature_change_resets_from_feature_questions():
+    assert stale_questions(_diff(changed=["city"]), ANSWERS) == [(3, 0), (3, 1), (3, 3), (4, 1)]
+
+
+def test_target_change_resets_from_class_balance_question():
+    assert stale_questions(_diff(changed=["label"]), ANSWERS) == [(2, 3), (3, 0), (3, 1), (3, 3), (4, 1)]
+
+
+def test_removed_feature_counts_as_changed():
+    assert stale_questions(_diff(removed=["age"]), ANSWERS)[0] == (3, 0)
+
+
+def test_unknown_diff_resets_everything_built_from_data():
+    assert stale_questions(None, ANSWERS)[0] == (2, 2)
+
+
+def test_unanswered_questions_are_not_reported():
+    answers = {(1, 0): {}, (2, 2): {"userResponse": "label"}}
+    assert stale_questions(_diff(changed=["label"]), answers) == []
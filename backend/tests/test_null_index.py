@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.null_index import NullIndex, NullIndexBuilder
+
+
+def _frame(rows: int = 1003) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "age": pd.array(np.where(rng.random(rows) < 0.2, None, rng.integers(18, 90, rows)), dtype="Int64"),
+        "city": np.where(rng.random(rows) < 0.1, None, "a"),
+        "income": np.where(rng.random(rows) < 0.05, np.nan, rng.random(rows)),
+    })
+
+
+def test_counts_match_pandas():
+    df = _frame()
+    index = NullIndex.from_frame(df)
+    expected = df.isna().sum()
+    assert index.row_count == len(df)
+    assert index.null_counts() == {col: int(n) for col, n in expected.items() if n}
+    assert "id" not in index.columns
+
+
+@pytest.mark.parametrize("columns", [["age"], ["age", "city"], ["age", "city", "income"], ["id"], []])
+def test_rows_with_nulls_matches_dropna(columns):
+    df = _frame()
+    index = NullIndex.from_frame(df)
+    assert index.rows_with_nulls(columns) == len(df) - len(df.dropna(subset=columns))
+
+
+def test_round_trip_through_bytes():
+    index = NullIndex.from_frame(_frame())
+    restored = NullIndex.from_bytes(index.to_bytes())
+    assert restored.row_count == index.row_count
+    assert restored.columns == index.columns
+    assert restored.null_counts() == index.null_counts()
+
+
+def test_builder_matches_whole_frame():
+    df = _frame()
+    builder = NullIndexBuilder()
+    for start in range(0, len(df), 200):
+        builder.update(df.iloc[start:start + 200])
+    built = builder.build()
+    whole = NullIndex.from_frame(df)
+    assert built.columns == whole.columns
+    assert np.array_equal(built.bits, whole.bits)
+
+
+def test_builder_rejects_unaligned_chunks():
+    builder = NullIndexBuilder()
+    builder.update(_frame(10))
+    with pytest.raises(ValueError):
+        builder.update(_frame(10))
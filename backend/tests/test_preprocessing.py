@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.preprocessing import preprocess, split_indices
+
+
+def test_split_is_seeded_and_partitions_rows():
+    train, test = split_indices(1000, 80)
+    again_train, again_test = split_indices(1000, 80)
+    assert np.array_equal(train, again_train) and np.array_equal(test, again_test)
+    assert len(test) == 200
+    assert np.array_equal(np.sort(np.concatenate([train, test])), np.arange(1000))
+    assert train.dtype == np.int32 and test.dtype == np.int32
+
+
+def test_stratified_split_keeps_class_shares():
+    target = np.where(np.arange(1000) % 10 == 0, "yes", "no")
+    train, test = split_indices(1000, 80, target)
+    assert (target[test] == "yes").sum() == 20
+    assert (target[train] == "yes").sum() == 80
+
+
+def test_stratified_split_puts_small_classes_on_both_sides():
+    target = np.array(["a"] * 97 + ["b", "b", "c"])
+    train, test = split_indices(100, 90, target)
+    assert set(target[train]) == {"a", "b", "c"}
+    assert "b" in set(target[test])
+    # A single-row class can't be split and stays in train
+    assert "c" not in set(target[test])
+
+
+def test_oversampled_rows_follow_their_source_row():
+    target = np.where(np.arange(1000) % 10 == 0, "yes", "no")
+    resampled_from = np.array([0, 10, 20, 30, 40, 10], dtype=np.int32)
+    train, test = split_indices(1000, 80, target, resampled_from)
+    copies = train[train >= 1000] - 1000
+    assert set(resampled_from[copies]).isdisjoint(test)
+    expected = [i for i, source in enumerate(resampled_from) if source not in set(test)]
+    assert sorted(copies.tolist()) == expected
+    assert not np.isin(test, np.arange(1000, 1006)).any()
+
+
+def _choices(**overrides):
+    return {"target": "label", "features": ["age", "city"], "missing": "mean",
+            "normalize": True, "oversample": False, **overrides}
+
+
+def test_parameters_fitted_on_fit_rows_only():
+    df = pd.DataFrame({
+        "age": [1.0, 2.0, None, 3.0, 100.0, 200.0],
+        "city": ["a", "a", None, "a", "b", "b"],
+        "label": ["x", "y", "x", "y", "x", "y"],
+    })
+    fit_rows = np.array([0, 1, 2, 3])
+    result, params, _ = preprocess(df, _choices(), fit_rows=fit_rows)
+    assert params["imputation"]["age"] == pytest.approx(2.0)
+    assert params["scaling"]["age"]["mean"] == pytest.approx(2.0)
+    assert params["imputation"]["city"] == "a"
+    assert params["encodings"]["city"] == ["a"]
+    # Scaled with train statistics: the training rows are centred, held-out rows are not
+    assert result["age"].iloc[fit_rows].mean() == pytest.approx(0.0)
+    assert result["age"].iloc[4:].min() > 10
+
+    full, full_params, _ = preprocess(df, _choices())
+    assert len(full) == len(result)
+    assert full_params["imputation"]["age"] == pytest.approx(61.2)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from services.profiler import ColumnHasher, column_hashes
+from services.schema import optimize_dtypes
+
+
+def _frame() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    rows = 2000
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "age": np.where(rng.random(rows) < 0.1, np.nan, rng.integers(18, 90, rows)),
+        "city": rng.choice(["a", "b", "c"], rows),
+        "income": rng.random(rows) * 100,
+        "flag": rng.random(rows) < 0.5,
+    })
+
+
+def test_hashes_ignore_storage_dtypes():
+    df = _frame()
+    optimized, schema = optimize_dtypes(df)
+    assert schema["age"] == "Int8" and schema["city"] == "category"
+    assert column_hashes(optimized) == column_hashes(df)
+
+
+def test_chunked_hashes_match_whole_frame():
+    df = _frame()
+    hasher = ColumnHasher()
+    for start in range(0, len(df), 300):
+        # Chunks infer their own dtypes, like a streamed read
+        hasher.update(optimize_dtypes(df.iloc[start:start + 300].reset_index(drop=True))[0])
+    assert hasher.result() == column_hashes(df)
+
+
+def test_hashes_detect_value_and_type_changes():
+    df = _frame()
+    before = column_hashes(df)
+    changed = df.assign(income=df["income"].where(df.index != 5, -1.0), id=df["id"].astype(str))
+    after = column_hashes(changed)
+    assert [col for col in df.columns if before[col] != after[col]] == ["id", "income"]
+
+
+def test_hashes_depend_on_row_order():
+    df = _frame()
+    assert column_hashes(df.iloc[::-1].reset_index(drop=True))["id"] != column_hashes(df)["id"]
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.sketches import HyperLogLog, MisraGries, TDigest
+
+
+def test_hyperloglog_estimate_within_error_bound():
+    values = pd.Series(np.arange(200_000))
+    sketch = HyperLogLog()
+    sketch.update(values)
+    # Three standard errors
+    assert abs(sketch.estimate() - 200_000) <= 3 * sketch.relative_error * 200_000
+
+
+def test_hyperloglog_small_counts_are_exact_enough():
+    sketch = HyperLogLog()
+    sketch.update(pd.Series(["a", "b", "c", None, "a"]))
+    assert sketch.estimate() == 3
+
+
+def test_hyperloglog_merge_matches_single_pass():
+    values = pd.Series(np.arange(50_000))
+    whole = HyperLogLog()
+    whole.update(values)
+    left, right = HyperLogLog(), HyperLogLog()
+    left.update(values[:20_000])
+    right.update(values[20_000:])
+    left.merge(right)
+    assert np.array_equal(left.registers, whole.registers)
+
+
+def test_misra_gries_undercounts_by_at_most_max_error():
+    rng = np.random.default_rng(0)
+    values = pd.Series(rng.zipf(1.5, 100_000) % 5_000)
+    sketch = MisraGries(k=64)
+    for start in range(0, len(values), 10_000):
+        sketch.update(values[start:start + 10_000])
+    exact = values.value_counts()
+    assert sketch.total == len(values)
+    for value, count in sketch.counts.items():
+        assert exact[value] - sketch.max_error <= count <= exact[value]
+    # Every value more frequent than the error bound is kept
+    assert set(exact[exact > sketch.max_error].index) <= set(sketch.counts.index)
+
+
+@pytest.mark.parametrize("q", [0.01, 0.25, 0.5, 0.75, 0.99])
+def test_tdigest_quantile_rank_error(q):
+    rng = np.random.default_rng(0)
+    data = rng.lognormal(size=200_000)
+    digest = TDigest()
+    for chunk in np.array_split(data, 20):
+        digest.update(pd.Series(chunk))
+    rank = np.searchsorted(np.sort(data), digest.quantile(q)) / len(data)
+    assert abs(rank - q) <= digest.rank_error
+    assert digest.total_weight == len(data)
+
+
+def test_tdigest_ignores_non_numeric_values():
+    digest = TDigest()
+    digest.update(pd.Series(["1", "x", None, "3"]))
+    assert digest.total_weight == 2
+    assert digest.quantile(0.5) == pytest.approx(2.0)
@@ -2,6 +2,11 @@ import React, { useState, useEffect, useRef } from "react";
 import { projectApi } from "../../services/projectApi";
 import "./QuestionComponents.css";
 
+// How often to poll the background validation of a confirmed upload
+const UPLOAD_POLL_INTERVAL_MS = 1000;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
 interface FileQuestionProps {
   questionText: string;
   projectId: string;
@@ -44,10 +49,9 @@ const FileQuestion: React.FC<FileQuestionProps> = ({
   }, [uploadedFile, uploadStatus, isRequired, onValidityChange]);
 
   const validateFile = (selectedFile: File): string | null => {
-    // Check file type
-    const fileExtension =
-      "." + selectedFile.name.split(".").pop()?.toLowerCase();
-    if (!fileTypes.includes(fileExtension)) {
+    // Check file type (suffixes like ".csv.gz" span more than one extension)
+    const fileName = selectedFile.name.toLowerCase();
+    if (!fileTypes.some((fileType) => fileName.endsWith(fileType))) {
       return `Invalid file type. Allowed types: ${fileTypes.join(", ")}`;
     }
 
@@ -108,14 +112,21 @@ const FileQuestion: React.FC<FileQuestionProps> = ({
       setUploadProgress(75);
       setUploadStatus("validating");
 
-      // Validate uploaded file
-      const validationResponse = await projectApi.validateFile(
+      // Confirm the upload and wait for the background validation
+      let status = await projectApi.completeUpload(
         projectId,
         uploadResponse.fileKey
       );
+      while (status.status === "queued" || status.status === "processing") {
+        await sleep(UPLOAD_POLL_INTERVAL_MS);
+        status = await projectApi.getUploadStatus(
+          projectId,
+          uploadResponse.fileKey
+        );
+      }
 
-      if (!validationResponse.success || !validationResponse.isValid) {
-        throw new Error(validationResponse.message);
+      if (status.status !== "ready") {
+        throw new Error(status.message);
       }
 
       setUploadProgress(100);
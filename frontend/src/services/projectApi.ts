@@ -168,6 +168,22 @@ export interface FileValidationResponse {
     columnCount: number;
     columns: string[];
   };
+  status?: UploadStatus;
+}
+
+export type UploadStatus = 'queued' | 'processing' | 'ready' | 'invalid' | 'failed';
+
+export interface UploadStatusResponse {
+  success: boolean;
+  fileKey: string;
+  status: UploadStatus;
+  message: string;
+  validationDetails?: {
+    rowCount: number;
+    columnCount: number;
+    columns: string[];
+  };
+  updatedAt?: string;
 }
 
 export interface ApiError {
@@ -228,6 +244,16 @@ const handleResponse = async <T>(response: Response): Promise<T> => {
   return response.json();
 };
 
+// Helper function to get the Content-Type the presigned upload URL was signed with
+const uploadContentType = (fileName: string): string => {
+  const name = fileName.toLowerCase();
+  if (name.endsWith('.csv.gz')) return 'application/gzip';
+  if (name.endsWith('.csv.zst')) return 'application/zstd';
+  if (name.endsWith('.parquet')) return 'application/vnd.apache.parquet';
+  if (name.endsWith('.feather')) return 'application/vnd.apache.arrow.file';
+  return 'text/csv';
+};
+
 // Enhanced API functions
 export const projectApi = {
   // Existing project functions
@@ -358,7 +384,7 @@ export const projectApi = {
       const response = await fetch(uploadUrl, {
         method: 'PUT',
         headers: {
-          'Content-Type': 'text/csv',
+          'Content-Type': uploadContentType(file.name),
         },
         body: file,
       });
@@ -370,6 +396,40 @@ export const projectApi = {
     }
   },
 
+  // Confirm an upload so the server validates and profiles it in the background
+  completeUpload: async (projectId: string, fileKey: string): Promise<UploadStatusResponse> => {
+    try {
+      const formData = new FormData();
+      formData.append('file_key', fileKey);
+
+      const response = await fetch(`${API_BASE_URL}/projects/${projectId}/upload-complete`, {
+        method: 'POST',
+        headers: getAuthHeadersForFormData(),
+        body: formData,
+      });
+
+      return handleResponse<UploadStatusResponse>(response);
+    } catch (error) {
+      console.error('Complete upload error:', error);
+      throw error;
+    }
+  },
+
+  getUploadStatus: async (projectId: string, fileKey: string): Promise<UploadStatusResponse> => {
+    try {
+      const params = new URLSearchParams({ file_key: fileKey });
+      const response = await fetch(`${API_BASE_URL}/projects/${projectId}/upload-status?${params}`, {
+        method: 'GET',
+        headers: getAuthHeaders(),
+      });
+
+      return handleResponse<UploadStatusResponse>(response);
+    } catch (error) {
+      console.error('Get upload status error:', error);
+      throw error;
+    }
+  },
+
   validateFile: async (projectId: string, fileKey: string): Promise<FileValidationResponse> => {
     try {
       const formData = new FormData();